@@ -1,3 +1,4 @@
+import { createHash } from 'crypto';
 import { createClient } from '@supabase/supabase-js';
 
 const supabase = createClient(
@@ -11,39 +12,39 @@ export default async function handler(req, res) {
   }
 
   try {
-    // Get total patterns
-    const { count: totalCount } = await supabase
-      .from('patterns')
-      .select('*', { count: 'exact', head: true });
-
-    // Get unarchived patterns
-    const { count: unarchivedCount } = await supabase
-      .from('patterns')
-      .select('*', { count: 'exact', head: true })
-      .is('batch_id', null);
-
-    // Get latest batch
-    const { data: latestBatch } = await supabase
-      .from('batches')
+    // Single snapshot row, kept current by the archiver (see archiver/schema.sql)
+    const { data: stats, error } = await supabase
+      .from('archive_stats')
       .select('*')
-      .order('id', { ascending: false })
-      .limit(1)
+      .eq('id', 1)
       .single();
 
-    // Get recent batches
-    const { data: recentBatches } = await supabase
-      .from('batches')
-      .select('*')
-      .order('id', { ascending: false })
-      .limit(10);
+    if (error) throw error;
+
+    const recentBatches = stats.recent_batches || [];
 
-    res.status(200).json({
-      total_patterns: totalCount,
-      unarchived: unarchivedCount,
-      latest_batch: latestBatch,
+    const body = {
+      total_patterns: stats.total_patterns,
+      unarchived: stats.unarchived,
+      latest_batch: recentBatches[0] || null,
+      // Digest stored by create_batch: top entities, authors, Merkle root
+      latest_digest: recentBatches[0]?.digest || null,
       recent_batches: recentBatches,
-      ready_to_post: unarchivedCount >= 500
-    });
+      window_aggregates: stats.window_aggregates || {},
+      ready_to_post: stats.unarchived >= stats.batch_size,
+      updated_at: stats.updated_at
+    };
+
+    // Snapshot only changes when the archiver writes, so let the CDN serve it
+    const etag = `"${createHash('sha1').update(JSON.stringify(body)).digest('hex')}"`;
+    res.setHeader('ETag', etag);
+    res.setHeader('Cache-Control', 'public, max-age=0, s-maxage=30, stale-while-revalidate=300');
+
+    if (req.headers['if-none-match'] === etag) {
+      return res.status(304).end();
+    }
+
+    res.status(200).json(body);
 
   } catch (error) {
     console.error('Stats error:', error);
@@ -17,14 +17,14 @@ export default async function handler(req, res) {
       // Untuk simple version, bisa return instruction
       res.status(200).json({ 
         message: 'Archive triggered',
-        instruction: 'Run: python archiver/scheduler.py on server'
+        instruction: 'Run: python -m archiver.scheduler --once on server'
       });
 
     } else if (action === 'post') {
       // Trigger post
       res.status(200).json({ 
         message: 'Post triggered',
-        instruction: 'Run: python archiver/scheduler.py --post on server'
+        instruction: 'Run: python -m archiver.scheduler --post on server'
       });
 
     } else {
@@ -0,0 +1,43 @@
+"""
+文 archiver
+
+Importable pipeline API:
+
+    from archiver import run_cycle, archive_job, save_patterns
+
+Names resolve on first use, so importing the package (or running the
+command line with --help) loads no network libraries.
+"""
+
+import importlib
+
+_API = {
+    "archive_job": "pipeline",
+    "run_cycle": "pipeline",
+    "threshold_archive_job": "pipeline",
+    "test_patterns": "pipeline",
+    "run_query": "pipeline",
+    "fetch_channel_casts": "scraper",
+    "process_casts": "extractor",
+    "save_patterns": "db",
+    "get_unarchived_count": "db",
+    "create_batch": "db",
+    "post_archive_notice": "poster",
+    "enqueue_notice": "outbox",
+    "drain_outbox": "outbox",
+    "analyze_recent_patterns": "pattern_analyzer",
+    "should_post_now": "pattern_analyzer",
+    "load_profiles": "profiles",
+}
+
+__all__ = list(_API)
+
+
+def __getattr__(name):
+    module = _API.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
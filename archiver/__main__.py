@@ -0,0 +1,7 @@
+"""python -m archiver: pattern-based scheduler command line"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,370 @@
+"""
+anomaly.py
+Online spike detection over ingested patterns
+
+Every stored pattern bumps hourly counters for its channel: total volume,
+plus one counter per hashtag, mention and domain. Once an hour is older
+than ANOMALY_OPEN_HOURS it is folded into an exponentially weighted mean
+and variance per metric, so each channel learns its own normal volume.
+An open hour whose count sits ANOMALY_Z_THRESHOLD standard deviations
+above that baseline is a spike.
+
+Near-duplicates count once: a cluster_id already counted in an hour
+for a channel is skipped, like the deduplicated analysis.
+
+The engine is fed from the store, not from the process that saved the
+rows: sync() reads patterns past the last id it observed, so casts
+ingested by shard workers reach the scheduler's posting decision. A
+cold engine reads back ANOMALY_WARMUP_HOURS + ANOMALY_OPEN_HOURS of
+history and is warm on its first sync. State persists between runs,
+one file per worker (get_engine(worker_id)); each file is a replay of
+the same stream, so no process's counts are lost to another's write.
+
+Per-pattern work is a handful of counter increments; folding costs one
+update per key seen in the closed hour.
+"""
+
+import json
+import math
+import multiprocessing
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from .config import (
+    ANOMALY_STATE_FILE,
+    ANOMALY_ALPHA,
+    ANOMALY_OPEN_HOURS,
+    ANOMALY_WARMUP_HOURS,
+    ANOMALY_Z_THRESHOLD,
+    ANOMALY_MIN_COUNT,
+    ANOMALY_MAX_ENTITIES,
+    PAGE_SIZE
+)
+from .timestamps import to_unix
+from .atomic import write_atomic
+
+# Cap on zero-count hours applied to a baseline after a gap
+MAX_IDLE_HOURS = 24 * 14
+
+
+def hour_of(timestamp):
+    """Unix hour of a pattern timestamp (see timestamps.py)"""
+    try:
+        return int(to_unix(timestamp) // 3600)
+    except (TypeError, ValueError):
+        return int(time.time() // 3600)
+
+
+def metric_keys(pattern):
+    """Metric keys one pattern counts towards"""
+
+    from .entity_index import postings_for
+
+    keys = ["volume"]
+    keys.extend(f"{p['kind']}:{p['entity']}" for p in postings_for(pattern))
+    return keys
+
+
+def _observe(stat, x, alpha=ANOMALY_ALPHA):
+    """Fold one hourly count into an EW mean/variance"""
+    diff = x - stat["mean"]
+    incr = alpha * diff
+    stat["mean"] += incr
+    stat["var"] = (1 - alpha) * (stat["var"] + diff * incr)
+
+
+def _decay(stat, hour):
+    """Apply the zero-count hours a key was absent up to (not incl.) hour"""
+    idle = min(hour - stat["last"] - 1, MAX_IDLE_HOURS)
+    for _ in range(max(0, idle)):
+        _observe(stat, 0)
+    stat["last"] = max(stat["last"], hour - 1)
+
+
+class AnomalyEngine:
+    """
+    Per-channel state ("all" aggregates every channel):
+        baselines  metric key -> {"mean", "var", "last"} (last folded hour)
+        open       hour -> {metric key: count} not yet folded
+        clusters   hour -> cluster_ids already counted in that open hour
+        folded     closed hours seen so far (for warm-up)
+        last_hour  newest closed hour
+
+    plus last_id, the newest pattern id observed from the store.
+    """
+
+    def __init__(self, path=ANOMALY_STATE_FILE):
+        self.path = path
+        self.channels = {}
+        self.last_id = None
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Load engine state (missing/corrupt file = cold start)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+            channels = raw["channels"]
+            for state in channels.values():
+                state["open"] = {int(h): c for h, c in state["open"].items()}
+                state["clusters"] = {int(h): set(ids) for h, ids in state.get("clusters", {}).items()}
+            self.channels = channels
+            self.last_id = raw.get("last_id")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Anomaly state unreadable, starting fresh: {e}")
+            self.channels = {}
+            self.last_id = None
+
+    def save(self):
+        if not self.path:
+            return
+
+        with self.lock:
+            snapshot = json.dumps({"last_id": self.last_id, "channels": self.channels}, default=sorted)
+
+        try:
+            write_atomic(self.path, snapshot)
+        except OSError as e:
+            print(f"⚠️ Anomaly state save error: {e}")
+
+    def _state(self, channel):
+        return self.channels.setdefault(channel or "all", {
+            "baselines": {},
+            "open": {},
+            "clusters": {},
+            "folded": 0,
+            "last_hour": None
+        })
+
+    def observe(self, patterns, now=None, fold=True):
+        """Count freshly ingested patterns into their channel's open hours"""
+
+        now_hour = int((now or time.time()) // 3600)
+
+        with self.lock:
+            for pattern in patterns:
+                hour = min(hour_of(pattern.get("timestamp")), now_hour)
+                keys = metric_keys(pattern)
+                cluster_id = pattern.get("cluster_id")
+
+                # Each pattern counts for its channel and for "all"
+                channels = {"all", pattern.get("channel") or "all"}
+                for channel in channels:
+                    state = self._state(channel)
+
+                    # Too late: that hour is already part of the baseline
+                    if state["last_hour"] is not None and hour <= state["last_hour"]:
+                        continue
+
+                    if cluster_id:
+                        counted = state.setdefault("clusters", {}).setdefault(hour, set())
+                        if cluster_id in counted:
+                            continue
+                        counted.add(cluster_id)
+
+                    counts = state["open"].setdefault(hour, {})
+                    for key in keys:
+                        counts[key] = counts.get(key, 0) + 1
+
+            if fold:
+                for state in self.channels.values():
+                    self._fold(state, now_hour)
+
+    def sync(self, now=None, page_size=PAGE_SIZE):
+        """
+        Observe every pattern stored since the last sync, whoever saved it
+
+        Hours are folded once at the end, so an hour split across pages
+        (or read back out of order on a cold start) is counted whole.
+
+        Returns: number of patterns read
+        """
+
+        from .db import iter_pages
+
+        now = now or time.time()
+        filters = []
+        if self.last_id is None:
+            since = datetime.fromtimestamp(now, timezone.utc) - timedelta(
+                hours=ANOMALY_WARMUP_HOURS + ANOMALY_OPEN_HOURS
+            )
+            filters.append(f"timestamp=gte.{since.isoformat()}")
+
+        read = 0
+        for page in iter_pages(
+            "patterns",
+            filters=filters,
+            select="cast_hash,cluster_id,timestamp,channel,entities",
+            page_size=page_size,
+            start_after=self.last_id
+        ):
+            self.observe(page, now=now, fold=False)
+            self.last_id = page[-1]["id"]
+            read += len(page)
+
+        now_hour = int(now // 3600)
+        with self.lock:
+            for state in self.channels.values():
+                self._fold(state, now_hour)
+
+        return read
+
+    def _fold(self, state, now_hour):
+        """Fold open hours older than ANOMALY_OPEN_HOURS into the baselines"""
+
+        cutoff = now_hour - ANOMALY_OPEN_HOURS
+        closing = sorted(h for h in state["open"] if h <= cutoff)
+        if not closing:
+            return
+
+        baselines = state["baselines"]
+        first = state["last_hour"] if state["last_hour"] is not None else closing[0] - 1
+
+        for hour in closing:
+            counts = state["open"].pop(hour)
+            state.get("clusters", {}).pop(hour, None)
+            # Volume is observed every hour, including empty ones
+            counts.setdefault("volume", 0)
+            for key, count in counts.items():
+                stat = baselines.setdefault(key, {"mean": 0.0, "var": 0.0, "last": first})
+                _decay(stat, hour)
+                _observe(stat, count)
+                stat["last"] = hour
+
+        # Empty hours since the last closed one still count towards warm-up
+        state["folded"] += closing[-1] - first
+        state["last_hour"] = closing[-1]
+
+        # Keep only the busiest entities
+        if len(baselines) > ANOMALY_MAX_ENTITIES:
+            ranked = sorted(
+                (k for k in baselines if k != "volume"),
+                key=lambda k: baselines[k]["mean"],
+                reverse=True
+            )
+            for key in ranked[ANOMALY_MAX_ENTITIES - 1:]:
+                del baselines[key]
+
+    def spikes(self, channel=None, now=None):
+        """
+        Metrics spiking in the channel's open hours
+
+        Returns: list of {"metric", "hour", "count", "mean", "z"}, highest z
+        first (empty while the baseline is still warming up)
+        """
+
+        now_hour = int((now or time.time()) // 3600)
+
+        with self.lock:
+            state = self._state(channel)
+            self._fold(state, now_hour)
+
+            if state["folded"] < ANOMALY_WARMUP_HOURS:
+                return []
+
+            found = {}
+            for hour, counts in state["open"].items():
+                for key, count in counts.items():
+                    if count < ANOMALY_MIN_COUNT:
+                        continue
+
+                    stat = state["baselines"].get(key)
+                    if stat:
+                        # Closed hours the key was absent for count as zeros
+                        gap = min(max(0, state["last_hour"] - stat["last"]), MAX_IDLE_HOURS)
+                        mean = stat["mean"] * (1 - ANOMALY_ALPHA) ** gap
+                        var = stat["var"] * (1 - ANOMALY_ALPHA) ** gap
+                    else:
+                        # Never seen before: any burst stands out
+                        mean, var = 0.0, 0.0
+
+                    # Poisson floor so quiet metrics don't turn 2 -> 3 into a spike
+                    z = (count - mean) / math.sqrt(max(var, mean, 1.0))
+                    if z >= ANOMALY_Z_THRESHOLD and z > found.get(key, {}).get("z", 0):
+                        found[key] = {
+                            "metric": key,
+                            "hour": hour,
+                            "count": count,
+                            "mean": round(mean, 2),
+                            "z": round(z, 2)
+                        }
+
+        return sorted(found.values(), key=lambda s: s["z"], reverse=True)
+
+    def is_warm(self, channel=None):
+        with self.lock:
+            return self._state(channel)["folded"] >= ANOMALY_WARMUP_HOURS
+
+    def window_summary(self, channel=None, hours=ANOMALY_OPEN_HOURS, limit=5, now=None):
+        """
+        Window aggregates from the open hours, without reading the store
+
+        Same keys as analyze_recent_patterns except the author ones,
+        which the engine does not track. None if the window is empty.
+        """
+
+        now_hour = int((now or time.time()) // 3600)
+        totals = {}
+
+        with self.lock:
+            state = self._state(channel)
+            self._fold(state, now_hour)
+            for hour, counts in state["open"].items():
+                if hour > now_hour - hours:
+                    for key, count in counts.items():
+                        totals[key] = totals.get(key, 0) + count
+
+        volume = totals.pop("volume", 0)
+        if not volume:
+            return None
+
+        def top(kind, prefix=""):
+            ranked = sorted(
+                ((k.split(":", 1)[1], c) for k, c in totals.items() if k.startswith(f"{kind}:")),
+                key=lambda kc: kc[1],
+                reverse=True
+            )
+            return [(f"{prefix}{entity}", count) for entity, count in ranked[:limit]]
+
+        return {
+            "total": volume,
+            "avg_per_hour": round(volume / hours, 2),
+            "trending_hashtags": top("hashtag", "#"),
+            "trending_mentions": top("mention", "@"),
+            "top_domains": top("domain"),
+            "timeframe_hours": hours,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+
+
+_engines = {}
+
+
+def _state_path(worker_id=None, path=ANOMALY_STATE_FILE):
+    """
+    State file for one worker
+
+    Without a worker_id, child processes are keyed by their process name
+    and the main process uses the configured file.
+    """
+    if worker_id is None:
+        name = multiprocessing.current_process().name
+        worker_id = None if name == "MainProcess" else name
+    if not path or worker_id is None:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}.{re.sub(r'[^A-Za-z0-9_.-]', '_', str(worker_id))}{ext}"
+
+
+def get_engine(worker_id=None):
+    path = _state_path(worker_id)
+    if path not in _engines:
+        _engines[path] = AnomalyEngine(path=path)
+    return _engines[path]
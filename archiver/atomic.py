@@ -0,0 +1,33 @@
+"""
+atomic.py
+Atomic file replacement for local state files
+
+Every writer gets its own temp file next to the target (mkstemp in the
+same directory, so os.replace stays on one filesystem and is atomic).
+Readers see the old file or the new one, never a partial write, and
+concurrent writers (threads, shard worker processes) cannot truncate
+each other's temp file.
+"""
+
+import os
+import tempfile
+
+
+def write_atomic(path, data):
+    """Replace path with data (str or bytes); raises OSError on failure"""
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data.encode("utf-8") if isinstance(data, str) else data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
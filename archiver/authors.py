@@ -0,0 +1,179 @@
+"""
+authors.py
+Cached author profiles from the hub's userDataByFid
+
+process_casts resolves every distinct author FID of a scrape in one
+pass (concurrent hub reads, one per FID not already cached) and fills
+in real usernames and display data, so no network call is made per
+cast. Profiles live in a local JSON store with a TTL; entries past
+AUTHOR_REFRESH_AHEAD of their TTL are still served but refreshed in the
+background, so the scrape never waits on a profile it already knows.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import AUTHORS_FILE, AUTHOR_TTL_HOURS, AUTHOR_REFRESH_AHEAD, HTTP_POOL_SIZE
+from .session import session
+from .atomic import write_atomic
+from .governor import governor
+
+PINATA_HUB = "https://hub.pinata.cloud"
+
+# Hub user data types we keep
+USER_DATA_FIELDS = {
+    "USER_DATA_TYPE_USERNAME": "username",
+    "USER_DATA_TYPE_DISPLAY": "display_name",
+    "USER_DATA_TYPE_PFP": "pfp_url"
+}
+
+
+def fetch_user_data(fid):
+    """One FID's profile from the hub, or None on error"""
+
+    try:
+        response = session.get(f"{PINATA_HUB}/v1/userDataByFid", params={"fid": fid}, timeout=15)
+        response.raise_for_status()
+        messages = response.json().get('messages', [])
+    except Exception as e:
+        print(f"✗ Error user data fid {fid}: {e}")
+        return None
+
+    profile = {}
+    for msg in messages:
+        body = msg.get('data', {}).get('userDataBody', {})
+        field = USER_DATA_FIELDS.get(body.get('type'))
+        if field:
+            profile[field] = body.get('value')
+
+    return profile
+
+
+class AuthorStore:
+    """FID -> profile, each with the unix time it was fetched"""
+
+    def __init__(self, path=AUTHORS_FILE, ttl_hours=AUTHOR_TTL_HOURS):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.profiles = {}
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Load cached profiles (missing/corrupt file = empty)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+            self.profiles = {int(fid): p for fid, p in raw.items()}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Author cache unreadable, starting fresh: {e}")
+            self.profiles = {}
+
+    def save(self):
+        if not self.path:
+            return
+
+        with self.lock:
+            snapshot = {str(fid): p for fid, p in self.profiles.items()}
+
+        try:
+            write_atomic(self.path, json.dumps(snapshot))
+        except OSError as e:
+            print(f"⚠️ Author cache save error: {e}")
+
+    def _fetch(self, fids):
+        """Fetch profiles concurrently and store the ones that came back"""
+
+        fids = list(fids)
+        if not fids:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=min(HTTP_POOL_SIZE, len(fids))) as pool:
+            results = list(pool.map(fetch_user_data, fids))
+        governor.charge("hub", len(fids))
+
+        now = time.time()
+        fetched = 0
+        with self.lock:
+            for fid, profile in zip(fids, results):
+                if profile is not None:
+                    self.profiles[fid] = {**profile, "fetched_at": now}
+                    fetched += 1
+        return fetched
+
+    def _refresh(self, fids):
+        try:
+            self._fetch(fids)
+            self.save()
+        finally:
+            with self.lock:
+                self.refreshing.difference_update(fids)
+
+    def resolve(self, fids, now=None):
+        """
+        Profiles for a set of FIDs
+
+        Missing or expired FIDs are fetched before returning; FIDs close
+        to expiry are returned from cache and refreshed in the background.
+
+        Returns: {fid: profile} (FIDs the hub could not serve are absent)
+        """
+
+        now = now or time.time()
+        fids = {int(f) for f in fids if f}
+
+        missing, due = [], []
+        with self.lock:
+            for fid in fids:
+                profile = self.profiles.get(fid)
+                age = now - profile["fetched_at"] if profile else None
+                if age is None or age >= self.ttl:
+                    missing.append(fid)
+                elif age >= self.ttl * AUTHOR_REFRESH_AHEAD and fid not in self.refreshing:
+                    due.append(fid)
+            self.refreshing.update(due)
+
+        if missing:
+            fetched = self._fetch(missing)
+            print(f"✓ Resolved {fetched}/{len(missing)} author profiles")
+            self.save()
+
+        if due:
+            threading.Thread(target=self._refresh, args=(due,), name="wen-authors", daemon=True).start()
+
+        with self.lock:
+            return {fid: self.profiles[fid] for fid in fids if fid in self.profiles}
+
+
+_store = None
+
+
+def get_author_store():
+    global _store
+    if _store is None:
+        _store = AuthorStore()
+    return _store
+
+
+def resolve_authors(casts):
+    """Fill username/display data on each cast's author from the store"""
+
+    profiles = get_author_store().resolve(c['author']['fid'] for c in casts)
+
+    for cast in casts:
+        profile = profiles.get(int(cast['author']['fid'] or 0))
+        if not profile:
+            continue
+        if profile.get("username"):
+            cast['author']['username'] = profile["username"]
+        cast['author']['display_name'] = profile.get("display_name")
+        cast['author']['pfp_url'] = profile.get("pfp_url")
+
+    return casts
@@ -0,0 +1,221 @@
+"""
+batch_export.py
+Columnar export of sealed batches
+
+Each batch sealed by create_batch is written once as a columnar file
+(zstd Parquet by default, Arrow IPC for zero-copy reads) with a manifest
+of its ID range and content hashes. Long-range analysis and archive
+distribution read these files instead of paging through Supabase.
+
+Needs pyarrow; without it the export is skipped and the batch is
+still sealed as before.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from .atomic import write_atomic
+from .config import SUPABASE_URL, EXPORT_DIR, EXPORT_FORMAT
+from .db import iter_pages, headers
+from .session import session
+
+COLUMNS = "id,cast_hash,author_fid,author_username,content,entities,timestamp,channel"
+
+
+def _schema(pa):
+    """Column layout; repeated values (FIDs, entities) are dictionary-encoded"""
+    dict_str = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("id", pa.int64()),
+        ("cast_hash", pa.string()),
+        ("author_fid", pa.dictionary(pa.int32(), pa.int64())),
+        ("author_username", dict_str),
+        ("content", pa.string()),
+        ("hashtags", pa.list_(dict_str)),
+        ("mentions", pa.list_(dict_str)),
+        ("urls", pa.list_(pa.string())),
+        ("timestamp", pa.string()),
+        ("channel", dict_str)
+    ])
+
+
+def content_hash(row):
+    """Stable hash of one archived pattern (cast hash + content + entities)"""
+    payload = json.dumps(
+        [row["cast_hash"], row.get("content") or "", row.get("entities") or {}],
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _to_table(pa, rows):
+    """Build the Arrow table for a batch"""
+
+    def entity_list(row, key):
+        return list((row.get("entities") or {}).get(key, []))
+
+    def dict_array(values, value_type):
+        return pa.array(values, type=value_type).dictionary_encode()
+
+    return pa.Table.from_arrays(
+        [
+            pa.array([r["id"] for r in rows], type=pa.int64()),
+            pa.array([r["cast_hash"] for r in rows], type=pa.string()),
+            dict_array([r["author_fid"] for r in rows], pa.int64()),
+            dict_array([r.get("author_username") for r in rows], pa.string()),
+            pa.array([r.get("content") for r in rows], type=pa.string()),
+            pa.array([entity_list(r, "hashtags") for r in rows], type=pa.list_(pa.dictionary(pa.int32(), pa.string()))),
+            pa.array([entity_list(r, "mentions") for r in rows], type=pa.list_(pa.dictionary(pa.int32(), pa.string()))),
+            pa.array([entity_list(r, "urls") for r in rows], type=pa.list_(pa.string())),
+            pa.array([str(r.get("timestamp")) for r in rows], type=pa.string()),
+            dict_array([r.get("channel") for r in rows], pa.string())
+        ],
+        schema=_schema(pa)
+    )
+
+
+def _indexed_batches(index):
+    """Batch ids already listed in manifest.jsonl"""
+
+    if not os.path.exists(index):
+        return set()
+
+    listed = set()
+    with open(index) as f:
+        for line in f:
+            try:
+                listed.add(json.loads(line)["batch_id"])
+            except (ValueError, KeyError):
+                continue
+    return listed
+
+
+def verify_export(path, rows):
+    """True if the written file reads back with the batch's rows and text"""
+
+    try:
+        table = read_batch(path)
+    except Exception as e:
+        print(f"✗ Export unreadable: {e}")
+        return False
+
+    return (
+        table.num_rows == len(rows)
+        and table.column("cast_hash").to_pylist() == [r["cast_hash"] for r in rows]
+        and table.column("content").to_pylist() == [r.get("content") for r in rows]
+    )
+
+
+def mark_exported(batch_id, file_sha256):
+    """Record the verified export on the batch (what prune_raw_content requires)"""
+
+    response = session.patch(
+        f"{SUPABASE_URL}/rest/v1/batches?id=eq.{batch_id}",
+        json={"exported_at": datetime.utcnow().isoformat(), "export_sha256": file_sha256},
+        headers=headers,
+        timeout=15
+    )
+    if response.status_code not in [200, 204]:
+        print(f"⚠️ Batch {batch_id} export mark failed: {response.status_code}")
+        return False
+    return True
+
+
+def export_batch(batch_id, out_dir=EXPORT_DIR, fmt=EXPORT_FORMAT):
+    """
+    Write a sealed batch and its manifest
+
+    The file is read back and checked against the rows before the batch
+    is marked exported, so raw content retention never prunes text that
+    only a broken file holds.
+
+    Returns: manifest dict, or None if skipped
+    """
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("⚠️ pyarrow not installed, skipping batch export")
+        return None
+
+    rows = []
+    for page in iter_pages("patterns", filters=[f"batch_id=eq.{batch_id}"], select=COLUMNS):
+        rows.extend(page)
+
+    if not rows:
+        print(f"⚠️ Batch {batch_id} has no patterns, nothing to export")
+        return None
+
+    os.makedirs(out_dir, exist_ok=True)
+    table = _to_table(pa, rows)
+
+    # Encoded in memory, then swapped in whole: a re-export never leaves a torn file
+    sink = pa.BufferOutputStream()
+    if fmt == "arrow":
+        path = os.path.join(out_dir, f"batch_{batch_id}.arrow")
+        # Uncompressed IPC: zero-copy when memory-mapped by read_batch
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        import pyarrow.parquet as pq
+        path = os.path.join(out_dir, f"batch_{batch_id}.parquet")
+        pq.write_table(table, sink, compression="zstd", use_dictionary=True)
+
+    data = sink.getvalue().to_pybytes()
+    write_atomic(path, data)
+    file_sha256 = hashlib.sha256(data).hexdigest()
+
+    row_hashes = [content_hash(r) for r in rows]
+
+    manifest = {
+        "batch_id": batch_id,
+        "file": os.path.basename(path),
+        "format": fmt,
+        "rows": len(rows),
+        "id_min": rows[0]["id"],
+        "id_max": rows[-1]["id"],
+        "first_timestamp": min(str(r.get("timestamp")) for r in rows),
+        "last_timestamp": max(str(r.get("timestamp")) for r in rows),
+        "channel": rows[0].get("channel"),
+        "bytes": len(data),
+        "file_sha256": file_sha256,
+        "content_sha256": hashlib.sha256("".join(row_hashes).encode()).hexdigest(),
+        "row_hashes": row_hashes,
+        "exported_at": datetime.utcnow().isoformat()
+    }
+
+    write_atomic(os.path.join(out_dir, f"batch_{batch_id}.manifest.json"), json.dumps(manifest, indent=2))
+
+    # One-line-per-batch index of everything exported (a re-export keeps its line)
+    index = os.path.join(out_dir, "manifest.jsonl")
+    if batch_id not in _indexed_batches(index):
+        summary = {k: v for k, v in manifest.items() if k != "row_hashes"}
+        with open(index, "a") as f:
+            f.write(json.dumps(summary) + "\n")
+
+    if verify_export(path, rows):
+        mark_exported(batch_id, file_sha256)
+    else:
+        print(f"✗ Batch {batch_id} export failed verification; its content will not be pruned")
+
+    print(f"✓ Exported batch {batch_id}: {len(rows)} patterns, {manifest['bytes']} bytes ({fmt})")
+    return manifest
+
+
+def read_batch(path):
+    """
+    Open an exported batch as an Arrow table, memory-mapped
+
+    Returns: pyarrow.Table
+    """
+
+    import pyarrow as pa
+
+    if path.endswith(".arrow"):
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+    import pyarrow.parquet as pq
+    return pq.read_table(path, memory_map=True)
@@ -0,0 +1,237 @@
+"""
+bloom.py
+Persistent Bloom filter of archived cast hashes
+
+Loaded at startup, updated on every successful save and rebuilt from
+the store periodically (or once it is over capacity) on a background
+thread. The scraper and shard workers use it to drop already-archived
+casts before extraction.
+
+A negative answer is exact: a hash the filter has not seen is always
+kept. Positives may be false (rate set by BLOOM_FP_RATE), so they are
+confirmed against the store before a cast is dropped; the filter never
+loses a new cast, it only saves work.
+"""
+
+import hashlib
+import math
+import struct
+import threading
+import time
+
+from .atomic import write_atomic
+from .config import BLOOM_FILE, BLOOM_CAPACITY, BLOOM_FP_RATE, BLOOM_REBUILD_HOURS
+
+MAGIC = b"WENBLOOM2"
+HEADER = struct.Struct(">QIQQdd")  # bits, hashes, capacity, count, fp_rate, built_at
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter with double hashing"""
+
+    def __init__(self, capacity=BLOOM_CAPACITY, fp_rate=BLOOM_FP_RATE):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.bits = max(8, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+        self.built_at = time.time()
+        self.lock = threading.Lock()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        with self.lock:
+            new = False
+            for pos in self._positions(key):
+                byte, bit = divmod(pos, 8)
+                if not self.array[byte] >> bit & 1:
+                    self.array[byte] |= 1 << bit
+                    new = True
+            if new:
+                self.count += 1
+
+    def add_many(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key):
+        return all(self.array[pos // 8] >> (pos % 8) & 1 for pos in self._positions(key))
+
+    def expected_fp_rate(self):
+        """False-positive rate at the current fill"""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def is_stale(self):
+        """Over capacity or older than BLOOM_REBUILD_HOURS"""
+        return (
+            self.count > self.capacity
+            or time.time() - self.built_at > BLOOM_REBUILD_HOURS * 3600
+        )
+
+    def save(self, path=BLOOM_FILE):
+        with self.lock:
+            data = MAGIC + HEADER.pack(
+                self.bits, self.hashes, self.capacity, self.count, self.fp_rate, self.built_at
+            ) + bytes(self.array)
+        write_atomic(path, data)
+
+    @classmethod
+    def load(cls, path=BLOOM_FILE):
+        """Filter from disk, or None if missing or unreadable"""
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return None
+                bits, hashes, capacity, count, fp_rate, built_at = HEADER.unpack(f.read(HEADER.size))
+                array = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+
+        # A changed BLOOM_FP_RATE takes effect through a rebuild
+        if len(array) != (bits + 7) // 8 or fp_rate != BLOOM_FP_RATE:
+            return None
+
+        bloom = cls.__new__(cls)
+        bloom.bits, bloom.hashes, bloom.count, bloom.built_at = bits, hashes, count, built_at
+        bloom.capacity, bloom.fp_rate = capacity, fp_rate
+        bloom.array = array
+        bloom.lock = threading.Lock()
+        return bloom
+
+
+def count_store():
+    """Number of patterns in the store (count=exact HEAD, no rows transferred)"""
+
+    from .config import SUPABASE_URL
+    from .db import headers
+    from .session import session
+
+    response = session.head(
+        f"{SUPABASE_URL}/rest/v1/patterns?select=id",
+        headers={**headers, "Prefer": "count=exact"},
+        timeout=60
+    )
+    response.raise_for_status()
+    return int(response.headers.get("Content-Range", "0-0/0").split("/")[-1])
+
+
+def rebuild_from_store(path=BLOOM_FILE):
+    """
+    Build a fresh filter from every cast_hash in patterns
+
+    The filter is sized from the store's row count up front and pages
+    are streamed straight into it, so no hash list is held in memory.
+    """
+
+    from .db import iter_pages
+
+    bloom = BloomFilter(capacity=max(BLOOM_CAPACITY, 2 * count_store()))
+
+    added = 0
+    for page in iter_pages("patterns", select="cast_hash"):
+        hashes = [p["cast_hash"] for p in page if p.get("cast_hash")]
+        bloom.add_many(hashes)
+        added += len(hashes)
+
+    bloom.save(path)
+
+    print(f"✓ Seen-cast filter rebuilt: {added} hashes, {bloom.bits // 8} bytes")
+    return bloom
+
+
+_seen = None
+_seen_lock = threading.Lock()
+# Hashes remembered while a rebuild runs, replayed into the new filter
+_pending = None
+
+
+def _rebuild_in_background():
+    global _seen, _pending
+
+    try:
+        bloom = rebuild_from_store()
+    except Exception as e:
+        print(f"⚠️ Seen-cast filter rebuild failed: {e}")
+        with _seen_lock:
+            _pending = None
+        return
+
+    with _seen_lock:
+        bloom.add_many(_pending or [])
+        _seen, _pending = bloom, None
+
+
+def get_seen_filter():
+    """
+    Process-wide filter: loaded from disk, rebuilt from the store when stale
+
+    Rebuilds run on a background thread; until one finishes the old
+    filter (or an empty one, which keeps every cast) keeps serving.
+    """
+
+    global _seen, _pending
+
+    with _seen_lock:
+        if _seen is None:
+            _seen = BloomFilter.load() or BloomFilter()
+            if not _seen.count:
+                # An empty filter would pass every stale check forever
+                _seen.built_at = 0
+
+        if _seen.is_stale() and _pending is None:
+            _pending = []
+            threading.Thread(target=_rebuild_in_background, name="wen-bloom", daemon=True).start()
+
+        return _seen
+
+
+def remember(hashes):
+    """Record saved cast hashes and persist the filter"""
+
+    bloom = get_seen_filter()
+    bloom.add_many(hashes)
+
+    with _seen_lock:
+        if _pending is not None:
+            _pending.extend(hashes)
+
+    try:
+        bloom.save()
+    except OSError as e:
+        print(f"⚠️ Seen-cast filter save error: {e}")
+
+
+def drop_known(casts):
+    """
+    Remove casts that are already archived
+
+    Filter negatives are kept without a lookup; filter positives are
+    confirmed with one store query so a false positive never drops a
+    new cast.
+    """
+
+    from .db import existing_hashes
+
+    bloom = get_seen_filter()
+    maybe_seen = [c['hash'] for c in casts if c['hash'] in bloom]
+
+    if not maybe_seen:
+        return casts
+
+    try:
+        known = existing_hashes(maybe_seen)
+    except Exception as e:
+        print(f"⚠️ Seen-cast check failed, keeping all casts: {e}")
+        return casts
+
+    kept = [c for c in casts if c['hash'] not in known]
+    false_positives = len(maybe_seen) - len(known)
+
+    print(f"✓ Skipped {len(casts) - len(kept)} already-archived casts ({false_positives} filter false positives)")
+    return kept
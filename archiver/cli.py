@@ -0,0 +1,180 @@
+"""
+cli.py
+Command line for the 文 schedulers
+
+Arguments are parsed before anything heavy is imported: --help costs
+no network libraries, and --once runs a single cycle and exits, for
+cron / serverless triggers instead of one long-lived loop.
+"""
+
+import sys
+
+PATTERN_HELP = """
+文 Archive Scheduler
+
+Usage:
+  python scheduler_pattern.py              # Run normal loop (archive + pattern-based posting)
+  python scheduler_pattern.py --once       # Run one cycle and exit (cron / serverless)
+  python scheduler_pattern.py --post       # Force post (bypass pattern check)
+  python scheduler_pattern.py --test-patterns  # Test pattern detection without posting
+  python scheduler_pattern.py --drain-outbox   # Post queued archive notices and exit
+  python scheduler_pattern.py --query TERM... [--days N]
+                                   # Entity lookup: #tag, @user, domain:x.com
+                                   # (several terms = patterns matching all)
+
+Also available as: python -m archiver [same options]
+
+Pattern-Only Mode:
+  文 only posts when interesting patterns are detected.
+  No fixed schedules, no monotonous posting.
+  Patterns include: hashtag trends, mention clustering, volume spikes, etc.
+"""
+
+THRESHOLD_HELP = """
+文 Archive Scheduler (fixed threshold)
+
+Usage:
+  python scheduler.py              # Run normal loop (archive every 12 hours)
+  python scheduler.py --once       # Run one cycle and exit (cron / serverless)
+  python scheduler.py --post       # Archive now and post if >= BATCH_SIZE patterns
+"""
+
+
+def drain_once():
+    """Post whatever archive notices are due (outbox)"""
+    from .outbox import drain_outbox
+    sent = drain_outbox()
+    print(f"✓ Outbox drained ({sent} notices sent)")
+    return sent
+
+
+def start_outbox_worker():
+    """Background drainer for loop mode, so posting never blocks ingestion"""
+    from .outbox import OutboxWorker
+    worker = OutboxWorker()
+    worker.start()
+    return worker
+
+
+def main(argv=None):
+    """Pattern-based scheduler (scheduler_pattern.py, python -m archiver)"""
+
+    argv = sys.argv[1:] if argv is None else argv
+    arg = argv[0] if argv else None
+
+    if arg in ('--help', '-h'):
+        print(PATTERN_HELP)
+        return 0
+
+    if arg == '--query':
+        terms = []
+        days = None
+        rest = list(argv[1:])
+        while rest:
+            token = rest.pop(0)
+            if token == '--days' and rest:
+                days = float(rest.pop(0))
+            else:
+                terms.append(token)
+
+        if not terms:
+            print("Usage: python scheduler_pattern.py --query TERM [TERM ...] [--days N]")
+            return 1
+
+        from .pipeline import run_query
+        run_query(terms, days=days)
+        return 0
+
+    if arg == '--drain-outbox':
+        drain_once()
+        return 0
+
+    if arg == '--test-patterns':
+        print("🔍 Testing pattern detection\n")
+        from .pipeline import test_patterns
+        test_patterns(hours=12)
+        return 0
+
+    if arg not in (None, '--post', '--once'):
+        print(f"Unknown option: {arg}")
+        print(PATTERN_HELP)
+        return 1
+
+    from .pipeline import run_cycle, run_forever, INTERVAL_HOURS
+    from .profiles import load_profiles, FairScheduler
+
+    profiles = load_profiles()
+    scheduler = FairScheduler(profiles)
+
+    if arg == '--post':
+        print("📤 Force post mode enabled")
+        run_cycle(scheduler, force_post=True)
+        drain_once()
+        return 0
+
+    if arg == '--once':
+        run_cycle(scheduler, force_post=False)
+        drain_once()
+        return 0
+
+    # Loop mode
+    print(f"文 archiver running (pattern-only mode)")
+    print(f"Profiles: {', '.join(p['name'] for p in profiles)}")
+    print(f"Archive interval: every {INTERVAL_HOURS} hours")
+    print(f"Posting: only when patterns detected")
+    print(f"\nCommands:")
+    print(f"  --once            Run one cycle and exit")
+    print(f"  --post            Force post now")
+    print(f"  --test-patterns   Check current patterns")
+    print(f"  --drain-outbox    Post queued notices now")
+    print(f"  Ctrl+C            Stop archiver\n")
+
+    start_outbox_worker()
+
+    try:
+        run_forever(lambda: run_cycle(scheduler, force_post=False), INTERVAL_HOURS)
+    except KeyboardInterrupt:
+        print("\n✓ Archiver stopped")
+    return 0
+
+
+def main_threshold(argv=None):
+    """Fixed-threshold scheduler (scheduler.py)"""
+
+    argv = sys.argv[1:] if argv is None else argv
+    arg = argv[0] if argv else None
+
+    if arg in ('--help', '-h'):
+        print(THRESHOLD_HELP)
+        return 0
+
+    if arg not in (None, '--post', '--once'):
+        print(f"Unknown option: {arg}")
+        print(THRESHOLD_HELP)
+        return 1
+
+    from .pipeline import threshold_archive_job, run_forever, INTERVAL_HOURS
+
+    if arg == '--post':
+        print("📤 Manual post mode enabled")
+        threshold_archive_job(should_post=True)
+        drain_once()
+        return 0
+
+    if arg == '--once':
+        threshold_archive_job(should_post=False)
+        drain_once()
+        return 0
+
+    print(f"文 archiver running.")
+    print(f"Will run every {INTERVAL_HOURS} hours.")
+    print(f"💡 To post manually: python scheduler.py --post")
+    print(f"Press Ctrl+C to stop.\n")
+
+    start_outbox_worker()
+
+    try:
+        run_forever(lambda: threshold_archive_job(should_post=False), INTERVAL_HOURS)
+    except KeyboardInterrupt:
+        print("\n✓ Archiver stopped")
+    return 0
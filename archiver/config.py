@@ -1,7 +1,16 @@
 import os
-from dotenv import load_dotenv
+import hashlib
 
-load_dotenv()
+# Repo-root .env (next to archiver/), then the working directory.
+# python-dotenv is optional: without it only the real environment is read.
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+if load_dotenv:
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
+    load_dotenv()
 
 # API Keys
 NEYNAR_API_KEY = os.getenv('NEYNAR_API_KEY')
@@ -18,6 +27,96 @@ FETCH_LIMIT = 50  # Reduced to avoid rate limits
 BATCH_SIZE = 500
 SCRAPE_INTERVAL = 12
 
+# Curated high-quality FIDs (always candidates for the frontier)
+CURATED_FIDS = [
+    12, 194, 1020, 2904, 446697, 1725, 5406, 11388,
+    2802, 4167, 2210, 9933, 210698, 7143, 190000,
+    864405, 5774, 12152, 4528, 13121, 99, 1606,
+    3621, 18723, 436577
+]
+
+# FID frontier (scraper target selection)
+FRONTIER_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontier_state.json')
+FETCH_REQUEST_BUDGET = 40  # hub requests per cycle
+MIN_FETCH_DEPTH = 2
+MAX_FETCH_DEPTH = 25
+
+# Profiles (one channel / FID set each, all run in one process)
+# JSON list of {"name", "channel_id", "fids", "parent_url", "weight"}
+PROFILES_FILE = os.getenv('WEN_PROFILES_FILE')
+
+# Shared resources across profiles
+HTTP_POOL_SIZE = 16
+EXTRACT_CACHE_SIZE = 5000  # cached extractions, keyed by cast text
+
+# Near-duplicate detection (dedup.py)
+DEDUP_MAX_DISTANCE = 8   # SimHash bits that may differ within a cluster
+DEDUP_MIN_TOKENS = 4     # shorter casts only cluster on exact text
+DEDUP_WINDOW = 50000     # recent clusters kept in memory
+DEDUP_ANALYSIS = True    # analyzer counts each cluster once
+
+# Sealed batch export (batch_export.py, needs pyarrow)
+EXPORT_DIR = os.getenv('WEN_EXPORT_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+EXPORT_FORMAT = "parquet"  # or "arrow" (uncompressed IPC, zero-copy mmap)
+
+# Archive notice outbox (outbox.py)
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_MIN_INTERVAL = 10    # seconds between casts
+OUTBOX_LEASE_SECONDS = 120  # a claimed notice is retried after this if unfinished
+OUTBOX_POLL_SECONDS = 60
+OUTBOX_RECONCILE_GRACE = 600  # seconds before a sealed, unqueued batch is queued by the drainer
+
+# Sharded ingestion (shard.py coordinator / workers)
+SHARD_DB_FILE = os.getenv('WEN_SHARD_DB') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shard_queue.db')
+SHARD_PARTITIONS = 64
+SHARD_VNODES = 64  # virtual nodes per worker on the hash ring
+SHARD_LEASE_SECONDS = 300  # one task (fetch + extraction + save) must fit in a lease
+SHARD_MIN_EXPECTED_NEW = 1.0  # FIDs expected to yield less are not re-queued yet
+SHARD_MAX_ATTEMPTS = 5     # failed runs of a task before it is dropped (the coordinator re-plans the FID)
+
+# Seen-cast filter (bloom.py): skips archived casts before extraction
+BLOOM_FILE = os.getenv('WEN_BLOOM_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seen_casts.bloom')
+BLOOM_CAPACITY = 1000000   # hashes before the filter is rebuilt larger
+BLOOM_FP_RATE = 0.001      # target false-positive rate (positives are re-checked)
+BLOOM_REBUILD_HOURS = 24   # periodic rebuild from the store
+
+# Author profiles (authors.py): hub userDataByFid, cached locally
+AUTHORS_FILE = os.getenv('WEN_AUTHORS_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'authors_cache.json')
+AUTHOR_TTL_HOURS = 24
+AUTHOR_REFRESH_AHEAD = 0.75  # share of the TTL after which a cached profile is refreshed in the background
+
+# Online spike detection (anomaly.py), fed from the store
+ANOMALY_STATE_FILE = os.getenv('WEN_ANOMALY_STATE_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'anomaly_state.json')
+ANOMALY_ALPHA = 0.05        # EW weight of each closed hour (~20h memory)
+ANOMALY_OPEN_HOURS = 12     # hours kept open for late casts before folding
+ANOMALY_WARMUP_HOURS = 48   # closed hours needed before spikes are trusted
+ANOMALY_Z_THRESHOLD = 3.0
+ANOMALY_MIN_COUNT = 5       # ignore metrics with fewer casts in the hour
+ANOMALY_MAX_ENTITIES = 2000 # entity baselines kept (busiest first)
+
+# Rollups and retention (rollup.py)
+ROLLUP_TOP_K = 50                  # entities kept per kind per hour/day bucket
+ROLLUP_RECOMPUTE_HOURS = 48        # recent hours re-rolled each run (late casts)
+ROLLUP_WINDOWS = (30, 90, 365)     # days pushed to the stats snapshot
+RAW_CONTENT_RETENTION_DAYS = 0     # drop archived, rolled-up, verified-exported text older than this (0 = keep)
+
+# Per-cycle budgets and load shedding (governor.py), 0 = unlimited
+GOVERNOR_HUB_REQUESTS = 200
+GOVERNOR_LLM_TOKENS = 150000
+GOVERNOR_DB_REQUESTS = 500
+GOVERNOR_CYCLE_SECONDS = 1800
+GOVERNOR_TIERS = (0.7, 0.85, 0.95)  # pressure for tier 1 / 2 / 3
+GOVERNOR_LOG_FILE = os.getenv('WEN_GOVERNOR_LOG') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'governor_log.jsonl')
+
+# Supabase reads (keyset pages, one page in memory at a time)
+PAGE_SIZE = 1000
+
+# Supabase writes (chunked bulk insert in save_patterns)
+SAVE_CHUNK_ROWS = 200
+SAVE_CHUNK_BYTES = 512 * 1024
+SAVE_PARALLEL = 4  # chunks in flight
+SAVE_RETRIES = 3
+
 # LLM Config (using Groq by default)
 MODEL = "llama-3.3-70b-versatile"
 API_URL = "https://api.groq.com/openai/v1/chat/completions"
@@ -34,3 +133,11 @@ Output ONLY valid JSON in this exact format:
 }
 
 If no entities found, return empty arrays. No additional text."""
+
+# Stored on every pattern; changes whenever MODEL or SYSTEM_PROMPT does
+EXTRACTOR_VERSION = f"{MODEL}:{hashlib.sha1(SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:8]}"
+
+# Bulk re-extraction of stored patterns (reextract.py)
+REEXTRACT_WORKERS = 4
+REEXTRACT_TOKEN_BUDGET = 200000  # per run; resume picks up the rest
+REEXTRACT_CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reextract_checkpoint.json')
@@ -1,5 +1,19 @@
-import requests
-from config import SUPABASE_URL, SUPABASE_KEY
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from .config import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    PAGE_SIZE,
+    SAVE_CHUNK_ROWS,
+    SAVE_CHUNK_BYTES,
+    SAVE_PARALLEL,
+    SAVE_RETRIES,
+    BATCH_SIZE
+)
+from .session import session
+from .governor import governor
 
 headers = {
     "apikey": SUPABASE_KEY,
@@ -7,6 +21,196 @@ headers = {
     "Content-Type": "application/json"
 }
 
+def channel_filters(channel):
+    """PostgREST filters scoping a query to one profile channel (None = all)"""
+    if not channel:
+        return []
+    return [f"channel=eq.{quote(channel, safe='')}"]
+
+
+def iter_pages(table, filters=None, select="*", page_size=PAGE_SIZE, start_after=None):
+    """
+    Stream rows from a table page by page
+
+    Keyset pagination on id (ordered, id=gt.<last>) with a Range header
+    per request, so results are never silently capped by the server's
+    max-rows and only one page is held in memory at a time.
+
+    Args:
+        table: table name (e.g. "patterns")
+        filters: list of PostgREST filters (e.g. ["timestamp=gte.2024-01-01"])
+        select: column list; id is always included for the keyset
+        page_size: rows requested per page
+        start_after: resume after this id
+
+    Yields: list of rows per page
+    """
+
+    columns = select.split(",")
+    if select != "*" and "id" not in columns:
+        columns.insert(0, "id")
+
+    base = f"{SUPABASE_URL}/rest/v1/{table}?select={','.join(columns)}&order=id.asc"
+    for f in filters or []:
+        base += f"&{f}"
+
+    page_headers = {
+        **headers,
+        "Range-Unit": "items",
+        "Range": f"0-{page_size - 1}"
+    }
+
+    last_id = start_after
+
+    while True:
+        url = base if last_id is None else f"{base}&id=gt.{last_id}"
+
+        response = session.get(url, headers=page_headers, timeout=30)
+        governor.charge("db")
+        response.raise_for_status()
+        rows = response.json()
+
+        # Stop only on an empty page: a short page may just be the
+        # server's max-rows cap, not the end of the data
+        if not rows:
+            return
+
+        yield rows
+        last_id = rows[-1]['id']
+
+
+def chunk_patterns(patterns, max_rows=SAVE_CHUNK_ROWS, max_bytes=SAVE_CHUNK_BYTES):
+    """Split patterns into chunks bounded by row count and JSON payload size"""
+    
+    chunk, size = [], 2
+    
+    for p in patterns:
+        row_size = len(json.dumps(p, ensure_ascii=False).encode('utf-8')) + 1
+        
+        if chunk and (len(chunk) >= max_rows or size + row_size > max_bytes):
+            yield chunk
+            chunk, size = [], 2
+        
+        chunk.append(p)
+        size += row_size
+    
+    if chunk:
+        yield chunk
+
+
+def existing_hashes(hashes):
+    """Subset of cast hashes already stored in patterns"""
+    
+    found = set()
+    
+    # Keep the in.() list well under URL length limits
+    for i in range(0, len(hashes), SAVE_CHUNK_ROWS):
+        quoted = ",".join(f'"{h}"' for h in hashes[i:i + SAVE_CHUNK_ROWS])
+        response = session.get(
+            f"{SUPABASE_URL}/rest/v1/patterns?select=cast_hash&cast_hash=in.({quote(quoted, safe=',')})",
+            headers=headers,
+            timeout=30
+        )
+        governor.charge("db")
+        response.raise_for_status()
+        found.update(p['cast_hash'] for p in response.json())
+    
+    return found
+
+
+def _insert_chunk(chunk):
+    """
+    Insert one chunk, retrying transient failures
+    
+    Returns: {"inserted": n, "skipped": n, "failed": n, "index_failed": n,
+              "saved": [hashes now stored]}
+    """
+    
+    hashes = [p['cast_hash'] for p in chunk]
+    insert_url = f"{SUPABASE_URL}/rest/v1/patterns?on_conflict=cast_hash"
+    insert_headers = {
+        **headers,
+        "Prefer": "return=minimal,resolution=ignore-duplicates,count=exact"
+    }
+    
+    for attempt in range(1, SAVE_RETRIES + 1):
+        try:
+            # Dedupe against the store for this chunk only
+            stored = existing_hashes(hashes)
+            
+            new_patterns = [p for p in chunk if p['cast_hash'] not in stored]
+            if not new_patterns:
+                return {"inserted": 0, "skipped": len(chunk), "failed": 0, "index_failed": 0, "saved": hashes}
+            
+            response = session.post(insert_url, json=new_patterns, headers=insert_headers, timeout=30)
+            governor.charge("db")
+            
+            if response.status_code in [200, 201, 204]:
+                # Rows actually written (conflicts raced in since the check are ignored)
+                content_range = response.headers.get('Content-Range', '')
+                count = content_range.split('/')[-1]
+                inserted = int(count) if count.isdigit() else len(new_patterns)
+                
+                # Keep the entity index in step with what was written
+                from .entity_index import index_patterns
+                indexed = index_patterns(new_patterns)
+                
+                return {
+                    "inserted": inserted,
+                    "skipped": len(chunk) - inserted,
+                    "failed": 0,
+                    "index_failed": 0 if indexed else len(new_patterns),
+                    "saved": hashes
+                }
+            
+            # Client errors will not succeed on retry
+            if response.status_code < 500 and response.status_code != 429:
+                print(f"✗ Database error: {response.status_code}")
+                print(f"Response: {response.text[:300]}")
+                break
+            
+            print(f"⚠️ Chunk insert {response.status_code}, retry {attempt}/{SAVE_RETRIES}")
+            
+        except Exception as e:
+            print(f"⚠️ Chunk insert error: {e}, retry {attempt}/{SAVE_RETRIES}")
+        
+        if attempt < SAVE_RETRIES:
+            time.sleep(2 ** attempt)
+    
+    return {"inserted": 0, "skipped": 0, "failed": len(chunk), "index_failed": 0, "saved": []}
+
+
+def insert_patterns(patterns):
+    """
+    Bulk insert patterns in bounded chunks, several in flight at once
+    
+    Each chunk is deduped, posted and retried on its own, so one bad
+    chunk never loses the rest of the cycle.
+    
+    Returns: {"inserted": n, "skipped": n, "failed": n, "index_failed": n}
+    """
+    
+    # Drop in-batch duplicates first
+    unique = list({p['cast_hash']: p for p in patterns}.values())
+    totals = {"inserted": 0, "skipped": len(patterns) - len(unique), "failed": 0, "index_failed": 0}
+    
+    chunks = list(chunk_patterns(unique))
+    saved = []
+    
+    with ThreadPoolExecutor(max_workers=SAVE_PARALLEL) as pool:
+        for result in pool.map(_insert_chunk, chunks):
+            for key in totals:
+                totals[key] += result[key]
+            saved.extend(result["saved"])
+    
+    # Only hashes confirmed in the store go into the seen-cast filter
+    if saved:
+        from .bloom import remember
+        remember(saved)
+    
+    return totals
+
+
 def save_patterns(patterns):
     """Save patterns to Supabase (skip duplicates)"""
     
@@ -14,45 +218,33 @@ def save_patterns(patterns):
         print("⚠️ No patterns to save")
         return True
     
-    url = f"{SUPABASE_URL}/rest/v1/patterns"
+    result = insert_patterns(patterns)
     
-    # Get existing cast hashes to avoid duplicates
-    existing_url = f"{SUPABASE_URL}/rest/v1/patterns?select=cast_hash"
+    if result["index_failed"]:
+        print(f"⚠️ {result['index_failed']} saved patterns missing from the entity index; run: python -m archiver.entity_index --rebuild")
     
-    try:
-        existing_response = requests.get(existing_url, headers=headers)
-        existing_hashes = set(p['cast_hash'] for p in existing_response.json())
-        
-        # Filter out duplicates
-        new_patterns = [p for p in patterns if p['cast_hash'] not in existing_hashes]
-        
-        if not new_patterns:
-            print("⚠️ No new patterns (all duplicates)")
-            return True
-        
-        # Insert only new patterns
-        response = requests.post(url, json=new_patterns, headers=headers)
-        
-        if response.status_code in [200, 201]:
-            print(f"✓ Saved {len(new_patterns)} new patterns (skipped {len(patterns) - len(new_patterns)} duplicates)")
-            return True
-        else:
-            print(f"✗ Database error: {response.status_code}")
-            print(f"Response: {response.text[:300]}")
-            return False
-            
-    except Exception as e:
-        print(f"✗ Database error: {e}")
+    if result["failed"]:
+        print(f"✗ Saved {result['inserted']} new patterns, {result['failed']} failed (skipped {result['skipped']} duplicates)")
         return False
+    
+    if not result["inserted"]:
+        print("⚠️ No new patterns (all duplicates)")
+        return True
+    
+    print(f"✓ Saved {result['inserted']} new patterns (skipped {result['skipped']} duplicates)")
+    return True
 
 
-def get_unarchived_count():
-    """Count unarchived patterns"""
+def get_unarchived_count(channel=None):
+    """Count unarchived patterns (optionally for one channel)"""
     
     url = f"{SUPABASE_URL}/rest/v1/patterns?batch_id=is.null&select=id"
+    for f in channel_filters(channel):
+        url += f"&{f}"
     
     try:
-        response = requests.get(url, headers={**headers, "Prefer": "count=exact"})
+        response = session.get(url, headers={**headers, "Prefer": "count=exact"})
+        governor.charge("db")
         
         # Parse count from Content-Range header
         content_range = response.headers.get('Content-Range', '0-0/0')
@@ -65,39 +257,117 @@ def get_unarchived_count():
         return 0
 
 
-def create_batch(start, end):
-    """Create batch and assign patterns"""
+def create_batch(start, end, channel=None):
+    """
+    Create batch and assign patterns (optionally for one channel)
+    
+    The batch row is inserted and up to BATCH_SIZE rows are claimed in
+    one transaction (seal_batch in schema.sql), so a failed claim never
+    leaves an empty batch behind. The claimed rows come back from the
+    same call and are digested (digest.py) onto the batch row: top
+    entities, authors, Merkle root.
+    
+    Returns: (batch_id, digest)
+    """
     
-    # Insert batch
     batch_url = f"{SUPABASE_URL}/rest/v1/batches"
-    batch_data = {
-        "start_entry": start,
-        "end_entry": end,
-        "total_patterns": end - start
-    }
     
     try:
-        response = requests.post(
-            batch_url, 
-            json=[batch_data], 
-            headers={**headers, "Prefer": "return=representation"}
+        response = session.post(
+            f"{SUPABASE_URL}/rest/v1/rpc/seal_batch",
+            json={"p_start": start, "p_end": end, "p_channel": channel, "p_limit": BATCH_SIZE},
+            headers=headers,
+            timeout=60
         )
         
-        if response.status_code not in [200, 201]:
-            raise Exception(f"Batch creation failed: {response.status_code}")
+        if response.status_code != 200:
+            raise Exception(f"Batch creation failed: {response.status_code} {response.text[:200]}")
         
-        batch_id = response.json()[0]['id']
+        sealed = response.json()
+        batch_id = sealed["batch_id"]
         
-        # Update patterns with batch_id (limit to 500)
-        pattern_url = f"{SUPABASE_URL}/rest/v1/patterns?batch_id=is.null&limit=500"
-        requests.patch(
-            pattern_url, 
-            json={"batch_id": batch_id}, 
+        # Digest of exactly the claimed rows, kept on the batch
+        from .digest import batch_digest
+        digest = batch_digest(sealed["rows"])
+        response = session.patch(
+            f"{batch_url}?id=eq.{batch_id}",
+            json={"digest": digest, "merkle_root": digest["merkle_root"]},
             headers=headers
         )
+        if response.status_code not in [200, 204]:
+            print(f"⚠️ Batch digest update failed: {response.status_code}")
+        print(f"✓ Batch {batch_id} digest: {digest['total']} patterns, root {digest['merkle_root']}")
+        
+        # Latest batches for the dashboard snapshot
+        update_stats_snapshot()
+        
+        # Columnar copy of the sealed batch (never blocks sealing)
+        try:
+            from .batch_export import export_batch
+            export_batch(batch_id)
+        except Exception as e:
+            print(f"⚠️ Batch export error: {e}")
         
-        return batch_id
+        return batch_id, digest
         
     except Exception as e:
         print(f"✗ Batch creation error: {e}")
         raise
+
+
+def update_stats_snapshot():
+    """
+    Refresh the latest batches in the stats snapshot
+    
+    Totals and unarchived counts are kept by triggers on patterns (see
+    schema.sql), so api/stats.js only ever reads the one archive_stats row.
+    """
+    
+    try:
+        response = session.get(
+            f"{SUPABASE_URL}/rest/v1/batches?select=*&order=id.desc&limit=10",
+            headers=headers,
+            timeout=15
+        )
+        response.raise_for_status()
+        
+        response = session.patch(
+            f"{SUPABASE_URL}/rest/v1/archive_stats?id=eq.1",
+            json={"batch_size": BATCH_SIZE, "recent_batches": response.json()},
+            headers={**headers, "Prefer": "return=minimal"},
+            timeout=15
+        )
+        if response.status_code not in [200, 204]:
+            print(f"⚠️ Stats snapshot error: {response.status_code}")
+            return False
+        return True
+        
+    except Exception as e:
+        print(f"⚠️ Stats snapshot error: {e}")
+        return False
+
+
+def update_stats_window(analysis, channel=None):
+    """Store the latest window aggregates for a channel in the stats snapshot"""
+    
+    if not analysis:
+        return False
+    
+    key = f"{channel or 'all'}:{analysis['timeframe_hours']}h"
+    
+    try:
+        response = session.post(
+            f"{SUPABASE_URL}/rest/v1/rpc/archive_stats_set_window",
+            json={"p_key": key, "p_value": analysis},
+            headers=headers,
+            timeout=15
+        )
+        governor.charge("db")
+        if response.status_code not in [200, 204]:
+            print(f"⚠️ Stats window error: {response.status_code}")
+            return False
+        return True
+        
+    except Exception as e:
+        print(f"⚠️ Stats window error: {e}")
+        return False
@@ -0,0 +1,127 @@
+"""
+dedup.py
+Near-duplicate cast detection (SimHash + LSH bands)
+
+Runs between scraper and extractor. Casts whose normalized text is
+within a small Hamming distance of a recent cast join its cluster, and
+every pattern carries its cluster_id so the analyzer can count spam
+bursts and copy-pasta once. Extracted entities are shared only between
+casts with the same normalized text: near-duplicates can differ in a
+hashtag or mention (a few bits of SimHash), so they are not copied.
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+
+from .config import DEDUP_MAX_DISTANCE, DEDUP_MIN_TOKENS, DEDUP_WINDOW
+
+BITS = 64
+BANDS = DEDUP_MAX_DISTANCE + 1  # pigeonhole: a match within the distance shares a band
+BAND_BITS = BITS // BANDS
+
+_URL = re.compile(r"https?://\S+")
+_NON_WORD = re.compile(r"[^\w@#$]+")
+
+
+def normalize_text(text):
+    """Case-fold, drop URLs and punctuation, collapse whitespace"""
+    text = _URL.sub(" ", (text or "").lower())
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def _h64(token):
+    return int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:8], "big")
+
+
+def simhash(tokens):
+    """64-bit SimHash over words and word bigrams"""
+
+    features = tokens + [" ".join(tokens[i:i + 2]) for i in range(len(tokens) - 1)]
+    weights = [0] * BITS
+
+    for feature in features:
+        h = _h64(feature)
+        for bit in range(BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    return sum(1 << bit for bit in range(BITS) if weights[bit] > 0)
+
+
+def _bands(fingerprint):
+    mask = (1 << BAND_BITS) - 1
+    return [(i, fingerprint >> (i * BAND_BITS) & mask) for i in range(BANDS)]
+
+
+class NearDupDetector:
+    """
+    Streaming near-duplicate clustering over a sliding window of casts
+
+    Short casts (fewer than DEDUP_MIN_TOKENS words) only cluster on an
+    exact normalized match; longer ones on SimHash distance.
+    """
+
+    def __init__(self, max_distance=DEDUP_MAX_DISTANCE, window=DEDUP_WINDOW):
+        self.max_distance = max_distance
+        self.window = window
+        self.fingerprints = OrderedDict()   # cluster_id -> fingerprint (None if short)
+        self.keys = {}                      # cluster_id -> normalized texts seen
+        self.buckets = {}                   # (band, value) -> set of cluster_ids
+        self.exact = {}                     # normalized text -> cluster_id
+        self.entities = {}                  # normalized text -> extracted entities
+
+    def _evict(self):
+        while len(self.fingerprints) > self.window:
+            cluster_id, fingerprint = self.fingerprints.popitem(last=False)
+            if fingerprint is not None:
+                for band in _bands(fingerprint):
+                    members = self.buckets.get(band)
+                    if members:
+                        members.discard(cluster_id)
+                        if not members:
+                            del self.buckets[band]
+            for key in self.keys.pop(cluster_id, []):
+                self.exact.pop(key, None)
+                self.entities.pop(key, None)
+
+    def assign(self, cast_hash, text):
+        """
+        Place a cast in a cluster
+
+        Returns: (cluster_id, is_new_cluster)
+        """
+
+        key = normalize_text(text)
+
+        if key in self.exact:
+            cluster_id = self.exact[key]
+            self.fingerprints.move_to_end(cluster_id)
+            return cluster_id, False
+
+        tokens = key.split()
+        fingerprint = simhash(tokens) if len(tokens) >= DEDUP_MIN_TOKENS else None
+
+        if fingerprint is not None:
+            for band in _bands(fingerprint):
+                for cluster_id in self.buckets.get(band, ()):
+                    if (fingerprint ^ self.fingerprints[cluster_id]).bit_count() <= self.max_distance:
+                        self.fingerprints.move_to_end(cluster_id)
+                        self.exact[key] = cluster_id
+                        self.keys[cluster_id].append(key)
+                        return cluster_id, False
+
+        # New cluster, represented by this cast
+        cluster_id = cast_hash
+        self.fingerprints[cluster_id] = fingerprint
+        self.keys[cluster_id] = [key]
+        self.exact[key] = cluster_id
+        if fingerprint is not None:
+            for band in _bands(fingerprint):
+                self.buckets.setdefault(band, set()).add(cluster_id)
+
+        self._evict()
+        return cluster_id, True
+
+
+# Shared by every process_casts call in the process
+detector = NearDupDetector()
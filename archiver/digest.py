@@ -0,0 +1,161 @@
+"""
+digest.py
+Per-batch digest: top entities, author distribution, Merkle root
+
+create_batch computes the digest from the rows it claims (the PATCH
+returns them), so nothing is rescanned. The digest is stored on the
+batch row and reused for the post text and the stats API.
+
+The Merkle root commits to the batch's cast hashes: leaves are
+sha256(cast_hash) in sorted order, parents are sha256 of the two
+children sorted bytewise (an odd node is carried up). The root is a
+bytes32 that can be written to contracts/WenArchive.sol, and a single
+cast can be proven against it with merkle_proof / verify_proof.
+
+Usage:
+  python -m archiver.digest BATCH_ID [...]   # recheck stored roots
+"""
+
+import hashlib
+from collections import Counter
+
+from .anomaly import hour_of
+
+
+def _sha256(data):
+    return hashlib.sha256(data).digest()
+
+
+def leaf(cast_hash):
+    return _sha256(cast_hash.encode("utf-8"))
+
+
+def _parent(a, b):
+    return _sha256(min(a, b) + max(a, b))
+
+
+def _levels(cast_hashes):
+    """Every tree level, leaves first"""
+
+    level = [leaf(h) for h in sorted(set(cast_hashes))]
+    levels = [level]
+    while len(level) > 1:
+        level = [
+            _parent(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+        levels.append(level)
+    return levels
+
+
+def merkle_root(cast_hashes):
+    """0x-prefixed hex root (None for an empty batch)"""
+    levels = _levels(cast_hashes)
+    if not levels[0]:
+        return None
+    return "0x" + levels[-1][0].hex()
+
+
+def merkle_proof(cast_hashes, cast_hash):
+    """Sibling hashes from the leaf up (hex), or None if not in the batch"""
+
+    levels = _levels(cast_hashes)
+    target = leaf(cast_hash)
+    if target not in levels[0]:
+        return None
+
+    index = levels[0].index(target)
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append("0x" + level[sibling].hex())
+        index //= 2
+    return proof
+
+
+def verify_proof(cast_hash, proof, root):
+    """True if the proof links cast_hash to root"""
+    node = leaf(cast_hash)
+    for sibling in proof:
+        node = _parent(node, bytes.fromhex(sibling[2:]))
+    return "0x" + node.hex() == root
+
+
+def batch_digest(rows, top=10):
+    """
+    Digest of a batch's rows (cast_hash, author_fid, entities, timestamp)
+
+    Keys follow analyze_recent_patterns where they overlap, so
+    generate_pattern_post_text takes either.
+    """
+
+    from .pattern_analyzer import extract_domain
+
+    hashtags, mentions, domains, authors = Counter(), Counter(), Counter(), Counter()
+    hours = []
+
+    for row in rows:
+        entities = row.get("entities") or {}
+        hashtags.update(entities.get("hashtags", []))
+        mentions.update(entities.get("mentions", []))
+        for url in entities.get("urls", []):
+            domain = extract_domain(url) if url else None
+            if domain and domain != "unknown":
+                domains[domain] += 1
+        authors[row.get("author_fid")] += 1
+        if row.get("timestamp") is not None:
+            hours.append(hour_of(row["timestamp"]))
+
+    total = len(rows)
+    span_hours = max(hours) - min(hours) + 1 if hours else 1
+    top_author = authors.most_common(1)
+
+    return {
+        "total": total,
+        "avg_per_hour": round(total / span_hours, 1),
+        "timeframe_hours": span_hours,
+        "trending_hashtags": hashtags.most_common(top),
+        "trending_mentions": mentions.most_common(top),
+        "top_domains": domains.most_common(top),
+        "top_authors": authors.most_common(top),
+        "unique_authors": len(authors),
+        "top_author_share": round(top_author[0][1] / total, 3) if top_author else 0,
+        "merkle_root": merkle_root([r["cast_hash"] for r in rows])
+    }
+
+
+def verify_batch(batch_id):
+    """
+    Recompute a sealed batch's Merkle root from its rows
+
+    Returns: (ok, stored_root, computed_root)
+    """
+
+    from .config import SUPABASE_URL
+    from .db import headers, iter_pages
+    from .session import session
+
+    response = session.get(
+        f"{SUPABASE_URL}/rest/v1/batches?id=eq.{batch_id}&select=merkle_root",
+        headers=headers,
+        timeout=15
+    )
+    response.raise_for_status()
+    rows = response.json()
+    stored = rows[0]["merkle_root"] if rows else None
+
+    hashes = []
+    for page in iter_pages("patterns", filters=[f"batch_id=eq.{batch_id}"], select="id,cast_hash"):
+        hashes.extend(p["cast_hash"] for p in page)
+
+    computed = merkle_root(hashes)
+    return stored is not None and stored == computed, stored, computed
+
+
+if __name__ == "__main__":
+    import sys
+
+    for arg in sys.argv[1:]:
+        ok, stored, computed = verify_batch(int(arg))
+        print(f"{'✓' if ok else '✗'} batch {arg}: stored {stored}, computed {computed}")
@@ -0,0 +1,200 @@
+"""
+entity_index.py
+Inverted entity index over the archive
+
+Every saved pattern adds one posting per entity to entity_postings
+(kind, entity -> cast_hash, timestamp). Lookups and time-range
+intersections then hit the (kind, entity, timestamp) index instead of
+scanning the opaque entities JSON on every pattern; intersections run
+server-side (entity_query in schema.sql).
+
+Usage:
+  python -m archiver.entity_index --rebuild   # re-index every stored pattern
+"""
+
+import sys
+import time
+from urllib.parse import quote
+
+from .config import SUPABASE_URL, SAVE_RETRIES
+from .db import headers, iter_pages, channel_filters
+from .session import session
+from .governor import governor
+from .pattern_analyzer import extract_domain
+
+def normalize(kind, value):
+    """Canonical form of an entity (case-folded, sigils stripped)"""
+    value = (value or "").strip().lower()
+    if kind == "hashtag":
+        return value.lstrip("#")
+    if kind == "mention":
+        return value.lstrip("@")
+    return value
+
+
+def parse_term(term):
+    """
+    Parse a query term into (kind, entity)
+
+    #tag -> hashtag, @user -> mention, domain:x.com or x.com -> domain
+    """
+    if term.startswith("#"):
+        return "hashtag", normalize("hashtag", term)
+    if term.startswith("@"):
+        return "mention", normalize("mention", term)
+    if term.startswith("domain:"):
+        return "domain", normalize("domain", term[len("domain:"):])
+    if "." in term:
+        return "domain", normalize("domain", term)
+    return "hashtag", normalize("hashtag", term)
+
+
+def postings_for(pattern):
+    """Posting rows for one pattern"""
+
+    entities = pattern.get("entities") or {}
+    keys = set()
+
+    for tag in entities.get("hashtags", []):
+        keys.add(("hashtag", normalize("hashtag", tag)))
+    for mention in entities.get("mentions", []):
+        keys.add(("mention", normalize("mention", mention)))
+    for url in entities.get("urls", []):
+        domain = extract_domain(url) if url else None
+        if domain and domain != "unknown":
+            keys.add(("domain", normalize("domain", domain)))
+
+    return [
+        {
+            "kind": kind,
+            "entity": entity,
+            "cast_hash": pattern["cast_hash"],
+            "timestamp": pattern.get("timestamp"),
+            "channel": pattern.get("channel")
+        }
+        for kind, entity in sorted(keys)
+        if entity
+    ]
+
+
+def index_patterns(patterns):
+    """
+    Add postings for newly saved patterns
+
+    Idempotent (duplicates ignored on the primary key), so retried
+    chunks never double-count. Transient failures are retried; if the
+    write still fails, run --rebuild to recover the missing postings.
+
+    Returns: True if the postings were written
+    """
+
+    rows = [row for p in patterns for row in postings_for(p)]
+    if not rows:
+        return True
+
+    url = f"{SUPABASE_URL}/rest/v1/entity_postings?on_conflict=kind,entity,cast_hash"
+
+    for attempt in range(1, SAVE_RETRIES + 1):
+        try:
+            response = session.post(
+                url,
+                json=rows,
+                headers={**headers, "Prefer": "return=minimal,resolution=ignore-duplicates"},
+                timeout=30
+            )
+            governor.charge("db")
+            if response.status_code in [200, 201, 204]:
+                return True
+            print(f"⚠️ Index write error: {response.status_code} {response.text[:200]}")
+            if response.status_code < 500 and response.status_code != 429:
+                return False
+        except Exception as e:
+            print(f"⚠️ Index write error: {e}")
+
+        if attempt < SAVE_RETRIES:
+            time.sleep(2 ** attempt)
+
+    return False
+
+
+def rebuild(page_size=500):
+    """
+    Re-index every stored pattern (backfill, or recovery after failed writes)
+
+    Returns: number of patterns indexed
+    """
+
+    indexed = 0
+    for page in iter_pages(
+        "patterns",
+        select="id,cast_hash,entities,timestamp,channel",
+        page_size=page_size
+    ):
+        if not index_patterns(page):
+            print(f"✗ Rebuild stopped at id {page[0]['id']}; rerun to retry")
+            break
+        indexed += len(page)
+        print(f"✓ {indexed} patterns indexed")
+
+    return indexed
+
+
+def lookup(kind, entity, since=None, until=None, channel=None):
+    """
+    Posting list for one entity
+
+    Returns: list of (cast_hash, timestamp), oldest first
+    """
+
+    filters = [f"kind=eq.{kind}", f"entity=eq.{quote(normalize(kind, entity), safe='')}"]
+    if since:
+        filters.append(f"timestamp=gte.{since}")
+    if until:
+        filters.append(f"timestamp=lt.{until}")
+    filters += channel_filters(channel)
+
+    postings = []
+    for page in iter_pages("entity_postings", filters=filters, select="cast_hash,timestamp"):
+        postings.extend((row["cast_hash"], row["timestamp"]) for row in page)
+
+    postings.sort(key=lambda posting: str(posting[1]))
+    return postings
+
+
+def query(terms, since=None, until=None, channel=None, limit=1000):
+    """
+    Patterns matching every term within a time range
+
+    The posting lists are intersected in the database (entity_query), so
+    only the matches come back, however long each list is.
+
+    Returns: list of (cast_hash, timestamp), oldest first (at most limit)
+    """
+
+    parsed = sorted(set(parse_term(t) for t in terms))
+    if not parsed:
+        return []
+
+    response = session.post(
+        f"{SUPABASE_URL}/rest/v1/rpc/entity_query",
+        json={
+            "p_terms": [{"kind": kind, "entity": entity} for kind, entity in parsed],
+            "p_since": since,
+            "p_until": until,
+            "p_channel": channel,
+            "p_limit": limit
+        },
+        headers=headers,
+        timeout=30
+    )
+    response.raise_for_status()
+
+    return [(row["cast_hash"], row["timestamp"]) for row in response.json()]
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv[1:]:
+        rebuild()
+    else:
+        print(__doc__)
+
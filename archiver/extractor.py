@@ -1,10 +1,81 @@
 import requests
 import json
+import re
 import time
-from config import GROQ_API_KEY, MODEL, SYSTEM_PROMPT
+import hashlib
+from collections import OrderedDict
+from .config import GROQ_API_KEY, MODEL, SYSTEM_PROMPT, EXTRACT_CACHE_SIZE, EXTRACTOR_VERSION
+from .session import session
+from .dedup import detector, normalize_text
+from .authors import resolve_authors
+from .governor import governor
 
-def extract_entities(cast_text):
-    """Extract entities using Groq with error handling"""
+# Rough completion size for one extraction (JSON with a few entities)
+OUTPUT_TOKENS = 60
+
+# Version tag for regex extractions; reextract.py upgrades these later
+LOCAL_EXTRACTOR_VERSION = "local:regex"
+
+HASHTAG_RE = re.compile(r"(?<![\w/])#(\w{2,})")
+MENTION_RE = re.compile(r"(?<![\w/])@([a-z0-9][a-z0-9_.-]*)", re.IGNORECASE)
+URL_RE = re.compile(r"https?://[^\s<>()\"']+")
+
+# Extraction cache shared by every profile in the process (LRU by text)
+_cache = OrderedDict()
+
+# LLM calls made by this process (shared rate protection across profiles)
+_llm_calls = 0
+
+
+def estimate_tokens(text):
+    """Approximate prompt + completion tokens for one extraction"""
+    return (len(SYSTEM_PROMPT) + len(text or "")) // 4 + OUTPUT_TOKENS
+
+
+def local_extract(cast_text):
+    """Regex extraction, used when the governor sheds LLM calls or the LLM fails"""
+    return {
+        "hashtags": list(dict.fromkeys(f"#{t}" for t in HASHTAG_RE.findall(cast_text))),
+        "mentions": list(dict.fromkeys(f"@{m.rstrip('.')}" for m in MENTION_RE.findall(cast_text))),
+        "urls": list(dict.fromkeys(u.rstrip('.,;:!?') for u in URL_RE.findall(cast_text)))
+    }
+
+
+def _cached_extract(cast_text):
+    """Cached, rate-limited extraction; returns (entities, ok)"""
+    
+    global _llm_calls
+    
+    key = hashlib.sha1(cast_text.encode('utf-8')).hexdigest()
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key], True
+    
+    governor.charge("tokens", estimate_tokens(cast_text))
+    
+    # Rate limit protection: pause every 10 requests
+    if _llm_calls > 0 and _llm_calls % 10 == 0:
+        print(f"⏳ rate limit protection, sleeping 2s")
+        time.sleep(2)
+    _llm_calls += 1
+    
+    entities, ok = _extract(cast_text)
+    
+    # Only successful extractions are cached; errors retry next time
+    if ok:
+        _cache[key] = entities
+        if len(_cache) > EXTRACT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    
+    return entities, ok
+
+
+def _extract(cast_text):
+    """
+    Extract entities using Groq with error handling
+    
+    Returns: (entities, ok) - ok is False when the empty result came from an error
+    """
     
     url = "https://api.groq.com/openai/v1/chat/completions"
     
@@ -24,13 +95,13 @@ def extract_entities(cast_text):
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=15)
+        response = session.post(url, json=payload, headers=headers, timeout=15)
         
         # Rate limit handling
         if response.status_code == 429:
             print(f"⏳ rate limited, sleeping 5s")
             time.sleep(5)
-            return {"hashtags": [], "mentions": [], "urls": []}
+            return {"hashtags": [], "mentions": [], "urls": []}, False
         
         response.raise_for_status()
         
@@ -54,30 +125,42 @@ def extract_entities(cast_text):
             "hashtags": result.get("hashtags", []),
             "mentions": result.get("mentions", []),
             "urls": result.get("urls", [])
-        }
+        }, True
         
     except requests.exceptions.RequestException as e:
         print(f"⚠️ LLM request error: {e}")
-        return {"hashtags": [], "mentions": [], "urls": []}
+        return {"hashtags": [], "mentions": [], "urls": []}, False
     except json.JSONDecodeError as e:
         print(f"⚠️ LLM skip: JSON parse error")
-        return {"hashtags": [], "mentions": [], "urls": []}
+        return {"hashtags": [], "mentions": [], "urls": []}, False
     except Exception as e:
         print(f"⚠️ LLM skip: {e}")
-        return {"hashtags": [], "mentions": [], "urls": []}
+        return {"hashtags": [], "mentions": [], "urls": []}, False
+
 
+def extract_entities(cast_text):
+    """Extract entities using Groq with error handling"""
+    return _extract(cast_text)[0]
 
-def process_casts(casts):
-    """Process casts with rate limiting"""
+
+def process_casts(casts, channel=None):
+    """
+    Process casts with rate limiting (tagged with the profile channel if given)
+    
+    Near-duplicate casts are clustered first. LLM entities are shared
+    only by casts with the same normalized text (URLs still come from
+    each cast); other cluster members get their own regex entities,
+    versioned so reextract.py upgrades them later.
+    """
     
     processed = []
+    clustered = 0
+    local = {"shed": 0, "fallback": 0}
     
-    for i, cast in enumerate(casts):
-        # Rate limit protection: pause every 10 requests
-        if i > 0 and i % 10 == 0:
-            print(f"⏳ rate limit protection, sleeping 2s")
-            time.sleep(2)
-        
+    # One profile lookup per distinct author, none per cast
+    resolve_authors(casts)
+    
+    for cast in casts:
         # Get cast text safely
         text = cast.get('text', '') or ''
         
@@ -85,19 +168,51 @@ def process_casts(casts):
         if not text.strip():
             continue
         
-        # Extract entities
-        entities = extract_entities(text)
+        cluster_id, is_new = detector.assign(cast['hash'], text)
+        key = normalize_text(text)
+        
+        # Extract entities once per normalized text (cached, rate limited)
+        version = EXTRACTOR_VERSION
+        if key in detector.entities:
+            # Same text up to case, punctuation and links: links are the cast's own
+            entities = {**detector.entities[key], "urls": local_extract(text)["urls"]}
+            clustered += 1
+        elif not is_new:
+            # Near-duplicate: may differ in a hashtag or mention, so its own
+            # regex entities; reextract.py upgrades them later
+            entities, version = local_extract(text), LOCAL_EXTRACTOR_VERSION
+            clustered += 1
+        elif governor.use_local_extraction():
+            entities, version = local_extract(text), LOCAL_EXTRACTOR_VERSION
+            local["shed"] += 1
+        else:
+            entities, ok = _cached_extract(text)
+            if ok:
+                detector.entities[key] = entities
+            else:
+                # Regex entities beat empty ones; reextract.py upgrades them later
+                entities, version = local_extract(text), LOCAL_EXTRACTOR_VERSION
+                local["fallback"] += 1
         
         pattern = {
             "cast_hash": cast['hash'],
             "author_fid": cast['author']['fid'],
             "author_username": cast['author'].get('username', 'unknown'),
+            "author_display_name": cast['author'].get('display_name'),
             "content": text,
             "entities": entities,
-            "timestamp": cast['timestamp']
+            "timestamp": cast['timestamp'],
+            "cluster_id": cluster_id,
+            # Local extractions carry their own version, so reextract.py picks them up
+            "extractor_version": version
         }
+        if channel:
+            pattern["channel"] = channel
         
         processed.append(pattern)
     
-    print(f"✓ processed {len(processed)} patterns")
+    if local["shed"] or local["fallback"]:
+        governor.note("local extraction", shed=local["shed"], llm_failures=local["fallback"])
+    
+    print(f"✓ processed {len(processed)} patterns ({clustered} near-duplicates reused cluster entities)")
     return processed
@@ -0,0 +1,181 @@
+"""
+frontier.py
+Prioritized FID frontier for scraper target selection
+
+Ranks FIDs by expected new casts per request so each cycle spends its
+hub budget where new casts are most likely. State persists between runs.
+"""
+
+import json
+import math
+import os
+import time
+import heapq
+
+from .config import (
+    CURATED_FIDS,
+    FRONTIER_STATE_FILE,
+    FETCH_REQUEST_BUDGET,
+    MIN_FETCH_DEPTH,
+    MAX_FETCH_DEPTH
+)
+from .timestamps import to_unix
+from .atomic import write_atomic
+
+# EWMA weight for new observations
+ALPHA = 0.3
+
+# Priors for FIDs that were never fetched (optimistic, so they get explored)
+PRIOR_RATE = 1.0        # casts per hour
+PRIOR_NEW_SHARE = 1.0   # share of fetched casts that were new
+
+# A full page of new casts only bounds the rate from below (the page cut
+# the count off), so the estimate is pushed up by this factor instead
+CENSORED_GROWTH = 2.0
+
+
+class FidFrontier:
+    """
+    Per-FID yield estimates
+
+    For every FID we keep:
+        rate       EWMA of new casts per hour since the previous fetch
+        new_share  EWMA of the share of fetched casts that were new
+        last_fetch unix time of the last poll
+        last_ts    newest cast time seen, unix seconds (to tell new casts from old)
+    """
+
+    def __init__(self, path=FRONTIER_STATE_FILE):
+        self.path = path
+        self.stats = {}
+        self.load()
+
+    def load(self):
+        """Load frontier state from disk (missing/corrupt file = empty)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+            self.stats = {int(fid): s for fid, s in raw.items()}
+            # State written before timestamps were converted holds hub seconds
+            for s in self.stats.values():
+                if s["last_ts"]:
+                    s["last_ts"] = to_unix(s["last_ts"])
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Frontier state unreadable, starting fresh: {e}")
+            self.stats = {}
+
+    def save(self):
+        """Persist frontier state"""
+        if not self.path:
+            return
+
+        try:
+            write_atomic(self.path, json.dumps({str(fid): s for fid, s in self.stats.items()}))
+        except OSError as e:
+            print(f"⚠️ Frontier save error: {e}")
+
+    def add(self, fids):
+        """Register candidate FIDs (known FIDs keep their stats)"""
+        for fid in fids:
+            self.stats.setdefault(int(fid), {
+                "rate": PRIOR_RATE,
+                "new_share": PRIOR_NEW_SHARE,
+                "last_fetch": 0,
+                "last_ts": 0
+            })
+
+    def expected_new(self, fid, now=None):
+        """Expected new casts if this FID were polled now"""
+        s = self.stats[fid]
+        now = now or time.time()
+
+        if not s["last_fetch"]:
+            # Never fetched: assume a full page of new casts
+            return MAX_FETCH_DEPTH * s["new_share"]
+
+        hours = max(0.0, (now - s["last_fetch"]) / 3600)
+        return s["rate"] * hours * max(s["new_share"], 0.05)
+
+    def plan(self, limit, budget=FETCH_REQUEST_BUDGET, now=None):
+        """
+        Pick FIDs to poll and how deep to fetch each
+
+        Args:
+            limit: total casts to request across all FIDs
+            budget: maximum hub requests (one per FID)
+
+        Returns: list of (fid, depth), highest expected yield first
+        """
+
+        now = now or time.time()
+
+        ranked = heapq.nlargest(
+            budget,
+            ((self.expected_new(fid, now), fid) for fid in self.stats)
+        )
+
+        if not ranked:
+            return []
+
+        # Split the cast budget in proportion to expected yield
+        total_expected = sum(score for score, _ in ranked) or 1.0
+
+        plan = []
+        for score, fid in ranked:
+            share = limit * score / total_expected
+            depth = int(math.ceil(share))
+            depth = max(MIN_FETCH_DEPTH, min(MAX_FETCH_DEPTH, depth))
+            plan.append((fid, depth))
+
+        return plan
+
+    def record(self, fid, casts, now=None, depth=None):
+        """
+        Update FID estimates after a fetch
+
+        Args:
+            depth: casts requested; a full page of new casts is censored
+                (the FID posted at least that many), so the rate grows by
+                CENSORED_GROWTH until a poll comes back with room to spare
+
+        Returns: number of casts newer than anything seen before
+        """
+
+        now = now or time.time()
+        self.add([fid])
+        s = self.stats[fid]
+
+        timestamps = [to_unix(c['timestamp']) for c in casts if c.get('timestamp')]
+        new_count = sum(1 for ts in timestamps if ts > s["last_ts"])
+
+        if casts:
+            share = new_count / len(casts)
+            s["new_share"] = (1 - ALPHA) * s["new_share"] + ALPHA * share
+
+        if s["last_fetch"]:
+            hours = max((now - s["last_fetch"]) / 3600, 1 / 60)
+            observed = new_count / hours
+            if depth and new_count and new_count >= depth:
+                observed = max(observed, s["rate"] * CENSORED_GROWTH)
+            s["rate"] = (1 - ALPHA) * s["rate"] + ALPHA * observed
+
+        if timestamps:
+            s["last_ts"] = max(s["last_ts"], max(timestamps))
+        s["last_fetch"] = now
+
+        return new_count
+
+
+def get_frontier(extra_fids=None, profile=None):
+    """Frontier seeded with the profile's FIDs (default: curated) plus extra candidates"""
+    if profile:
+        frontier = FidFrontier(profile["state_file"])
+        frontier.add(profile["fids"])
+    else:
+        frontier = FidFrontier()
+        frontier.add(CURATED_FIDS)
+    frontier.add(extra_fids or [])
+    return frontier
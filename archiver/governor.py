@@ -0,0 +1,184 @@
+"""
+governor.py
+Per-cycle budgets and tiered load shedding
+
+Every cycle gets a budget of hub requests, LLM tokens, database
+requests and wall-clock time. The scraper, extractor and every
+Supabase read/write of the cycle charge what they use; pressure is the highest used/budget share (time counts as
+elapsed / GOVERNOR_CYCLE_SECONDS). As pressure crosses GOVERNOR_TIERS the
+cycle sheds load, one tier at a time, and never steps back down:
+
+    1  low-yield FIDs are fetched at minimum depth
+    2  extraction switches to local regex matching (no LLM calls)
+    3  analysis / posting decision is deferred to the next cycle
+
+Hitting a budget outright stops that kind of work (backpressure) rather
+than sleeping:
+
+    hub     no more fetches this cycle
+    tokens  extraction is local for the rest of the cycle
+    db      analysis, posting decisions and rollups wait for the next
+            cycle (casts already fetched are still saved, not dropped)
+    time    all of the above at once
+
+Each decision is printed and appended to
+GOVERNOR_LOG_FILE (JSON lines) with the usage that caused it.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from .config import (
+    GOVERNOR_HUB_REQUESTS,
+    GOVERNOR_LLM_TOKENS,
+    GOVERNOR_DB_REQUESTS,
+    GOVERNOR_CYCLE_SECONDS,
+    GOVERNOR_TIERS,
+    GOVERNOR_LOG_FILE
+)
+
+TIER_NAMES = {
+    0: "normal",
+    1: "shallow low-yield fetches",
+    2: "local extraction",
+    3: "defer analysis"
+}
+
+
+class Governor:
+    """Budgets and shedding tier for the current cycle"""
+
+    def __init__(self, log_file=GOVERNOR_LOG_FILE):
+        self.log_file = log_file
+        self.lock = threading.Lock()
+        # Unlimited until a pipeline cycle starts (reextract/shard runs are not governed)
+        self.start_cycle(label="idle", hub=0, tokens=0, db=0, seconds=0)
+
+    def start_cycle(self, label="cycle", hub=GOVERNOR_HUB_REQUESTS, tokens=GOVERNOR_LLM_TOKENS,
+                    db=GOVERNOR_DB_REQUESTS, seconds=GOVERNOR_CYCLE_SECONDS):
+        """Reset usage and budgets (0 = unlimited)"""
+        with self.lock:
+            self.label = label
+            self.budgets = {"hub": hub, "tokens": tokens, "db": db}
+            self.used = {"hub": 0, "tokens": 0, "db": 0}
+            self.seconds = seconds
+            self.started = time.time()
+            self.tier = 0
+            self.exhausted = set()
+            self.decisions = []
+
+    def _record(self, action, **detail):
+        """Log one decision with the usage behind it (lock held)"""
+
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "cycle": self.label,
+            "action": action,
+            "tier": self.tier,
+            "used": dict(self.used),
+            "budgets": dict(self.budgets),
+            "elapsed": round(time.time() - self.started, 1),
+            **detail
+        }
+        self.decisions.append(entry)
+        print(f"🎛 governor: {action} {detail or ''}")
+
+        if self.log_file:
+            try:
+                with open(self.log_file, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"⚠️ Governor log error: {e}")
+
+    def pressure(self):
+        """Highest share of any budget used, time included"""
+
+        shares = [
+            self.used[k] / self.budgets[k]
+            for k in self.budgets if self.budgets[k]
+        ]
+        if self.seconds:
+            shares.append((time.time() - self.started) / self.seconds)
+        return max(shares, default=0.0)
+
+    def _update(self, resource):
+        """Escalate the tier / mark exhaustion after a charge (lock held)"""
+
+        if self.budgets[resource] and self.used[resource] >= self.budgets[resource] \
+                and resource not in self.exhausted:
+            self.exhausted.add(resource)
+            self._record("budget exhausted", resource=resource)
+
+        if self.seconds and time.time() - self.started >= self.seconds \
+                and "time" not in self.exhausted:
+            self.exhausted.add("time")
+            self._record("budget exhausted", resource="time")
+
+        pressure = self.pressure()
+        tier = sum(1 for threshold in GOVERNOR_TIERS if pressure >= threshold)
+        if tier > self.tier:
+            self.tier = tier
+            self._record(f"shed to tier {tier}", mode=TIER_NAMES[tier], pressure=round(pressure, 2))
+
+    def charge(self, resource, amount=1):
+        with self.lock:
+            self.used[resource] += amount
+            self._update(resource)
+
+    def remaining(self, resource):
+        """Budget left for a resource (None = unlimited)"""
+        with self.lock:
+            if not self.budgets[resource]:
+                return None
+            return max(0, self.budgets[resource] - self.used[resource])
+
+    def allow(self, resource):
+        """False once the resource's budget, or the cycle's time, is spent"""
+        with self.lock:
+            self._update(resource)
+            return resource not in self.exhausted and "time" not in self.exhausted
+
+    def scrape_depth(self, fid, depth, low_yield, min_depth):
+        """Depth for one planned fetch under the current tier"""
+        with self.lock:
+            self._update("hub")
+            if self.tier >= 1 and low_yield and depth > min_depth:
+                self._record("shallow fetch", fid=fid, depth=depth, to=min_depth)
+                return min_depth
+        return depth
+
+    def use_local_extraction(self):
+        """True when LLM extraction should be skipped"""
+        with self.lock:
+            self._update("tokens")
+            return self.tier >= 2 or bool(self.exhausted & {"tokens", "time"})
+
+    def defer_analysis(self, what="analysis"):
+        """True (and recorded) when analysis should wait for the next cycle"""
+        with self.lock:
+            self._update("db")
+            if self.tier >= 3 or self.exhausted & {"db", "time"}:
+                self._record("deferred", what=what)
+                return True
+        return False
+
+    def note(self, action, **detail):
+        """Record a decision taken elsewhere under the governor's budgets"""
+        with self.lock:
+            self._record(action, **detail)
+
+    def summary(self):
+        with self.lock:
+            return {
+                "cycle": self.label,
+                "tier": self.tier,
+                "used": dict(self.used),
+                "budgets": dict(self.budgets),
+                "elapsed": round(time.time() - self.started, 1),
+                "decisions": len(self.decisions)
+            }
+
+
+governor = Governor()
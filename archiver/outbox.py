@@ -0,0 +1,215 @@
+"""
+outbox.py
+Durable outbox for Farcaster archive notices
+
+archive_job only enqueues a notice (one row per batch_id in post_outbox)
+and moves on; a background drainer posts due notices with retries,
+exponential backoff and a minimum gap between casts. batch_id is the
+idempotency key both in the table and towards Neynar, so a notice is
+never posted twice. Each drain also queues sealed batches that never
+got a notice (the process died between sealing and enqueueing), so a
+sealed batch is never left silently unposted.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
+from .config import (
+    SUPABASE_URL,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_MIN_INTERVAL,
+    OUTBOX_LEASE_SECONDS,
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_RECONCILE_GRACE
+)
+from .db import headers
+from .session import session
+from .poster import notice_text, send_cast, attach_cast_hash
+
+OUTBOX_URL = f"{SUPABASE_URL}/rest/v1/post_outbox"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def enqueue_notice(batch_id, start, end, text=None):
+    """
+    Queue the archive notice for a batch (no-op if already queued)
+
+    Returns: True if the notice is in the outbox
+    """
+
+    row = {
+        "batch_id": batch_id,
+        "text": text or notice_text(start, end, batch_id),
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": _now().isoformat()
+    }
+
+    try:
+        response = session.post(
+            f"{OUTBOX_URL}?on_conflict=batch_id",
+            json=[row],
+            headers={**headers, "Prefer": "return=minimal,resolution=ignore-duplicates"},
+            timeout=15
+        )
+        if response.status_code not in [200, 201, 204]:
+            print(f"✗ Outbox enqueue failed: {response.status_code} {response.text[:200]}")
+            return False
+        print(f"✓ Queued archive notice for batch {batch_id}")
+        return True
+    except Exception as e:
+        print(f"✗ Outbox enqueue error: {e}")
+        return False
+
+
+def reconcile(limit=10):
+    """
+    Queue notices for sealed batches that have none and were never posted
+
+    Returns: number of notices queued
+    """
+
+    response = session.post(
+        f"{SUPABASE_URL}/rest/v1/rpc/unqueued_batches",
+        json={"p_grace_seconds": OUTBOX_RECONCILE_GRACE, "p_limit": limit},
+        headers=headers,
+        timeout=15
+    )
+    response.raise_for_status()
+
+    queued = 0
+    for batch in response.json():
+        start, end = batch["start_entry"], batch["end_entry"]
+        text = notice_text(start, end, batch["id"], batch.get("digest"))
+        print(f"⚠️ Batch {batch['id']} was sealed without a notice, queueing it")
+        if enqueue_notice(batch["id"], start, end, text=text):
+            queued += 1
+    return queued
+
+
+def _claim(limit):
+    """Lease due notices (pending, or 'sending' with an expired lease)"""
+
+    now = _now()
+    due = f"status=in.(pending,sending)&next_attempt_at=lte.{quote(now.isoformat())}"
+    lease_until = (now + timedelta(seconds=OUTBOX_LEASE_SECONDS)).isoformat()
+
+    # A 'sending' row whose lease ran out belongs to a drainer that died
+    response = session.get(
+        f"{OUTBOX_URL}?select=batch_id&{due}&order=batch_id.asc&limit={limit}",
+        headers=headers,
+        timeout=15
+    )
+    response.raise_for_status()
+
+    claimed = []
+    for row in response.json():
+        # Conditional update: only one drainer wins each row
+        response = session.patch(
+            f"{OUTBOX_URL}?batch_id=eq.{row['batch_id']}&{due}",
+            json={"status": "sending", "next_attempt_at": lease_until},
+            headers={**headers, "Prefer": "return=representation"},
+            timeout=15
+        )
+        if response.status_code == 200 and response.json():
+            claimed.append(response.json()[0])
+
+    return claimed
+
+
+def _update(batch_id, fields):
+    session.patch(
+        f"{OUTBOX_URL}?batch_id=eq.{batch_id}",
+        json={**fields, "updated_at": _now().isoformat()},
+        headers=headers,
+        timeout=15
+    )
+
+
+def _deliver(notice):
+    """Post one claimed notice and record the outcome"""
+
+    batch_id = notice["batch_id"]
+    cast_hash = notice.get("cast_hash")
+    error = None
+
+    # A previous attempt may have posted but failed to attach
+    if not cast_hash:
+        cast_hash, error = send_cast(notice["text"], idem=f"wen-batch-{batch_id}")
+
+    if cast_hash and attach_cast_hash(batch_id, cast_hash):
+        _update(batch_id, {"status": "sent", "cast_hash": cast_hash, "last_error": None})
+        return True
+
+    attempts = notice.get("attempts", 0) + 1
+    error = error or "cast_hash attach failed"
+
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        print(f"✗ Batch {batch_id} notice failed after {attempts} attempts: {error}")
+        _update(batch_id, {"status": "failed", "attempts": attempts, "cast_hash": cast_hash, "last_error": error})
+        return False
+
+    backoff = min(3600, 30 * 2 ** attempts)
+    _update(batch_id, {
+        "status": "pending",
+        "attempts": attempts,
+        "cast_hash": cast_hash,
+        "last_error": error,
+        "next_attempt_at": (_now() + timedelta(seconds=backoff)).isoformat()
+    })
+    print(f"⏳ Batch {batch_id} notice retry {attempts}/{OUTBOX_MAX_ATTEMPTS} in {backoff}s")
+    return False
+
+
+def drain_outbox(limit=10):
+    """
+    Post due notices once
+
+    Returns: number of notices sent
+    """
+
+    try:
+        reconcile(limit)
+    except Exception as e:
+        print(f"⚠️ Outbox reconcile error: {e}")
+
+    try:
+        notices = _claim(limit)
+    except Exception as e:
+        print(f"⚠️ Outbox read error: {e}")
+        return 0
+
+    sent = 0
+    for i, notice in enumerate(notices):
+        # Rate limit between casts
+        if i > 0:
+            time.sleep(OUTBOX_MIN_INTERVAL)
+        try:
+            if _deliver(notice):
+                sent += 1
+        except Exception as e:
+            print(f"⚠️ Outbox delivery error (batch {notice['batch_id']}): {e}")
+
+    return sent
+
+
+class OutboxWorker(threading.Thread):
+    """Daemon thread draining the outbox every OUTBOX_POLL_SECONDS"""
+
+    def __init__(self, poll_seconds=OUTBOX_POLL_SECONDS):
+        super().__init__(name="wen-outbox", daemon=True)
+        self.poll_seconds = poll_seconds
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            drain_outbox()
+            self.stopped.wait(self.poll_seconds)
+
+    def stop(self):
+        self.stopped.set()
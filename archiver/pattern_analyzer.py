@@ -5,10 +5,13 @@ Detects patterns in archived data and determines posting significance
 文 only posts when patterns are interesting, not on fixed schedules
 """
 
-import requests
 from collections import Counter
 from datetime import datetime, timedelta
-from config import SUPABASE_URL, SUPABASE_KEY
+from urllib.parse import quote
+from .config import SUPABASE_URL, SUPABASE_KEY, DEDUP_ANALYSIS, ANOMALY_OPEN_HOURS
+from .db import iter_pages, channel_filters
+from .session import session
+from .governor import governor
 
 headers = {
     "apikey": SUPABASE_KEY,
@@ -17,50 +20,70 @@ headers = {
 }
 
 
-def analyze_recent_patterns(hours=12):
+def analyze_recent_patterns(hours=12, channel=None, dedup=DEDUP_ANALYSIS):
     """
-    Analyze patterns from last N hours
+    Analyze patterns from last N hours (optionally for one channel)
     Returns comprehensive pattern analysis
+    
+    With dedup, each near-duplicate cluster counts once, so spam bursts
+    and copy-pasta don't inflate volume or trends. The first member of
+    each cluster in the window is picked server-side (analysis_patterns
+    in schema.sql), so memory stays one page no matter how many
+    clusters the window holds.
     """
     
     cutoff = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
-    
-    # Fetch recent patterns
-    url = f"{SUPABASE_URL}/rest/v1/patterns?timestamp=gte.{cutoff}&select=*"
+    window = [f"timestamp=gte.{cutoff}"] + channel_filters(channel)
+    
+    # Stream recent patterns page by page into the counters
+    hashtag_counts = Counter()
+    mention_counts = Counter()
+    author_counts = Counter()
+    domain_counts = Counter()
+    total_patterns = 0
+    duplicates = 0
+    
+    if dedup:
+        source = "rpc/analysis_patterns"
+        filters = [f"p_since={cutoff}"] + (
+            [f"p_channel={quote(channel, safe='')}"] if channel else []
+        )
+    else:
+        source, filters = "patterns", window
     
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        patterns = response.json()
+        for page in iter_pages(source, filters=filters, select="author_fid,entities"):
+            for p in page:
+                total_patterns += 1
+                entities = p.get('entities') or {}
+                hashtag_counts.update(entities.get('hashtags', []))
+                mention_counts.update(entities.get('mentions', []))
+                author_counts[p['author_fid']] += 1
+                
+                # Extract domains from URLs
+                for url in entities.get('urls', []):
+                    if url:
+                        domain = extract_domain(url)
+                        if domain and domain != "unknown":
+                            domain_counts[domain] += 1
     except Exception as e:
         print(f"⚠️ Pattern fetch error: {e}")
         return None
     
-    if not patterns:
+    if not total_patterns:
         return None
     
-    # Extract all entities
-    all_hashtags = []
-    all_mentions = []
-    all_urls = []
-    
-    for p in patterns:
-        entities = p.get('entities', {})
-        all_hashtags.extend(entities.get('hashtags', []))
-        all_mentions.extend(entities.get('mentions', []))
-        all_urls.extend(entities.get('urls', []))
-    
-    # Count occurrences
-    hashtag_counts = Counter(all_hashtags)
-    mention_counts = Counter(all_mentions)
-    author_counts = Counter(p['author_fid'] for p in patterns)
-    
-    # Extract domains from URLs
-    domains = [extract_domain(url) for url in all_urls if url]
-    domain_counts = Counter(d for d in domains if d and d != "unknown")
+    if dedup:
+        url = f"{SUPABASE_URL}/rest/v1/patterns?select=id&limit=1&" + "&".join(window)
+        try:
+            response = session.get(url, headers={**headers, "Prefer": "count=exact"}, timeout=30)
+            governor.charge("db")
+            content_range = response.headers.get('Content-Range', '0-0/0')
+            duplicates = max(0, int(content_range.split('/')[-1]) - total_patterns)
+        except Exception as e:
+            print(f"⚠️ Duplicate count error: {e}")
     
     # Calculate metrics
-    total_patterns = len(patterns)
     avg_per_hour = total_patterns / hours if hours > 0 else 0
     unique_authors = len(author_counts)
     
@@ -72,6 +95,7 @@ def analyze_recent_patterns(hours=12):
         "trending_mentions": mention_counts.most_common(5),
         "top_authors": author_counts.most_common(10),
         "top_domains": domain_counts.most_common(5),
+        "duplicates": duplicates,
         "timeframe_hours": hours,
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -158,6 +182,9 @@ def generate_pattern_post_text(analysis, batch_id, start, end):
     """
     Generate post text based on detected patterns
     Non-monotonous, pattern-focused
+    
+    Takes a batch digest (digest.py) or a window analysis; a digest
+    also adds the batch's Merkle root.
     """
     
     if not analysis:
@@ -206,11 +233,13 @@ def generate_pattern_post_text(analysis, batch_id, start, end):
     # Entry range
     lines.append("")
     lines.append(f"#{start}–#{end}")
+    if analysis.get('merkle_root'):
+        lines.append(f"root {analysis['merkle_root'][:18]}")
     
     return "\n".join(lines)
 
 
-def get_active_fids(hours=24, min_casts=5):
+def get_active_fids(hours=24, min_casts=5, channel=None):
     """
     Automatically detect currently active FIDs
     Returns list of FIDs that posted >= min_casts in last N hours
@@ -218,19 +247,19 @@ def get_active_fids(hours=24, min_casts=5):
     
     cutoff = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
     
-    url = f"{SUPABASE_URL}/rest/v1/patterns?timestamp=gte.{cutoff}&select=author_fid"
-    
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        patterns = response.json()
+        # Count casts per FID, one page at a time
+        fid_counts = Counter()
+        for page in iter_pages(
+            "patterns",
+            filters=[f"timestamp=gte.{cutoff}"] + channel_filters(channel),
+            select="author_fid"
+        ):
+            fid_counts.update(p['author_fid'] for p in page)
         
-        if not patterns:
+        if not fid_counts:
             return []
         
-        # Count casts per FID
-        fid_counts = Counter(p['author_fid'] for p in patterns)
-        
         # Filter by minimum threshold
         active_fids = [fid for fid, count in fid_counts.items() if count >= min_casts]
         
@@ -248,56 +277,50 @@ def get_target_fids():
     Get target FIDs for scraping
     
     Strategy:
-    1. Check for active FIDs in last 24h
-    2. If < 10 active, use curated list
-    3. Combine both (dedupe)
+    1. Seed the frontier with curated FIDs + active FIDs in last 24h
+    2. Rank every known FID by expected new casts per request
     """
     
-    # Curated high-quality FIDs (your list)
-    CURATED_FIDS = [
-        12, 194, 1020, 2904, 446697, 1725, 5406, 11388,
-        2802, 4167, 2210, 9933, 210698, 7143, 190000,
-        864405, 5774, 12152, 4528, 13121, 99, 1606,
-        3621, 18723, 436577
-    ]
+    from .frontier import get_frontier
+    from .config import CURATED_FIDS
     
     # Get currently active FIDs
     active_fids = get_active_fids(hours=24, min_casts=3)
     
-    # Combine (curated first, then active, dedupe)
-    combined = []
-    seen = set()
+    frontier = get_frontier(active_fids)
+    ranked = sorted(frontier.stats, key=frontier.expected_new, reverse=True)
     
-    for fid in CURATED_FIDS:
-        if fid not in seen:
-            combined.append(fid)
-            seen.add(fid)
+    print(f"✓ Target FIDs: {len(ranked)} total ({len(CURATED_FIDS)} curated + {len(active_fids)} active)")
     
-    for fid in active_fids:
-        if fid not in seen:
-            combined.append(fid)
-            seen.add(fid)
-    
-    print(f"✓ Target FIDs: {len(combined)} total ({len(CURATED_FIDS)} curated + {len(active_fids)} active)")
-    
-    return combined
+    return ranked
 
 
-def should_post_now(min_patterns=100, analysis_hours=12):
+def should_post_now(min_patterns=100, analysis_hours=12, channel=None):
     """
     Determine if 文 should post right now based on patterns
     
+    Once the channel's spike baselines are warm (anomaly.py) the decision
+    comes straight from them, and the raw window is only analyzed when
+    posting (for the post text). Until then the fixed cutoffs in
+    detect_pattern_significance are used.
+    
     Args:
         min_patterns: Minimum patterns required before considering
         analysis_hours: Hours to analyze for patterns
+        channel: Profile channel to scope the decision to (None = all)
     
     Returns:
-        (should_post: bool, reason: str, analysis: dict)
+        (should_post: bool, reason: str, analysis: dict or None)
     """
     
+    from .anomaly import get_engine
+    
     # Check if we have enough data
     url = f"{SUPABASE_URL}/rest/v1/patterns?batch_id=is.null&select=id"
-    response = requests.get(url, headers={**headers, "Prefer": "count=exact"})
+    for f in channel_filters(channel):
+        url += f"&{f}"
+    response = session.get(url, headers={**headers, "Prefer": "count=exact"})
+    governor.charge("db")
     
     content_range = response.headers.get('Content-Range', '0-0/0')
     unarchived_count = int(content_range.split('/')[-1])
@@ -305,8 +328,33 @@ def should_post_now(min_patterns=100, analysis_hours=12):
     if unarchived_count < min_patterns:
         return False, f"insufficient data ({unarchived_count}/{min_patterns})", None
     
+    # Baselines catch up on everything stored, shard-ingested patterns included
+    engine = get_engine()
+    try:
+        engine.sync()
+        engine.save()
+    except Exception as e:
+        print(f"⚠️ Anomaly sync error, using fixed cutoffs: {e}")
+        engine = None
+    
+    if engine and engine.is_warm(channel):
+        spikes = engine.spikes(channel)
+        if not spikes:
+            # Window aggregates still refresh, from the engine's open hours
+            if analysis_hours <= ANOMALY_OPEN_HOURS:
+                analysis = engine.window_summary(channel, hours=analysis_hours)
+            else:
+                analysis = analyze_recent_patterns(hours=analysis_hours, channel=channel)
+            return False, "no spikes against baseline", analysis
+        
+        reason_str = "; ".join(f"{s['metric']} {s['count']}/h (z {s['z']})" for s in spikes[:5])
+        analysis = analyze_recent_patterns(hours=analysis_hours, channel=channel)
+        if analysis:
+            analysis['spikes'] = spikes
+        return True, f"spikes detected: {reason_str}", analysis
+    
     # Analyze patterns
-    analysis = analyze_recent_patterns(hours=analysis_hours)
+    analysis = analyze_recent_patterns(hours=analysis_hours, channel=channel)
     
     if not analysis:
         return False, "no analysis data", None
@@ -0,0 +1,249 @@
+"""
+pipeline.py
+Archive pipeline: scrape -> extract -> save -> batch -> post
+
+Importable without side effects; the schedulers' command line lives in
+cli.py and only imports this module when a job actually runs.
+"""
+
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from .scraper import fetch_channel_casts
+from .extractor import process_casts
+from .db import save_patterns, get_unarchived_count, create_batch, update_stats_window
+from .outbox import enqueue_notice
+from .poster import notice_text
+from .pattern_analyzer import (
+    analyze_recent_patterns,
+    detect_pattern_significance,
+    should_post_now,
+    generate_pattern_post_text
+)
+from .profiles import load_profiles, default_profile, FairScheduler
+from .rollup import maintain
+from .governor import governor
+from .config import BATCH_SIZE
+
+INTERVAL_HOURS = 12
+TEST_POST = False  # Set True to force post even with < BATCH_SIZE
+
+
+def archive_job(force_post=False, profile=None, budget=None):
+    """
+    Main archiving job with pattern-based posting
+    
+    Args:
+        force_post: Override pattern detection and post anyway
+        profile: Channel / FID-set profile to archive (None = default set)
+        budget: Hub requests this profile may spend this cycle
+    """
+    
+    channel = profile["channel_id"] if profile else None
+    label = f" [{profile['name']}]" if profile else ""
+    
+    print(f"\n=== 文 Archive Job{label} - {datetime.now()} ===")
+
+    try:
+        # 1. Fetch casts
+        casts = fetch_channel_casts(budget=budget, profile=profile)
+        if not casts:
+            print("No casts to process")
+            return
+
+        # 2. Process with LLM extraction
+        patterns = process_casts(casts, channel=channel)
+        
+        if not patterns:
+            print("⚠️ No patterns extracted")
+            return
+
+        # 3. Save to database
+        save_patterns(patterns)
+
+        # 4. Check unarchived count
+        count = get_unarchived_count(channel=channel)
+        print(f"Unarchived patterns: {count}")
+
+        # 5. Pattern-based posting decision
+        if force_post:
+            print("📤 Force post mode - bypassing pattern check")
+            should_post = True
+            post_reason = "manual override"
+            analysis = analyze_recent_patterns(hours=12, channel=channel)
+        elif governor.defer_analysis(f"posting decision{label}"):
+            # Unarchived rows wait; the next cycle decides with a fresh budget
+            should_post = False
+            post_reason = "deferred by governor"
+            analysis = None
+        else:
+            # Check if patterns are significant
+            should_post, post_reason, analysis = should_post_now(
+                min_patterns=100,  # Minimum data needed
+                analysis_hours=12,
+                channel=channel
+            )
+        
+        print(f"Post decision: {should_post}")
+        print(f"Reason: {post_reason}")
+        
+        # Keep the dashboard's window aggregates current
+        update_stats_window(analysis, channel=channel)
+        
+        if should_post and count >= 100:
+            # Create batch
+            end = count
+            start = max(0, end - min(count, BATCH_SIZE))
+            
+            try:
+                batch_id, digest = create_batch(start, end, channel=channel)
+                print(f"✓ Created batch {batch_id} ({start}–{end})")
+                
+                # Post text describes the sealed batch itself (its digest)
+                post_text = generate_pattern_post_text(digest or analysis, batch_id, start, end)
+                
+                print(f"\nPost preview:")
+                print("---")
+                print(post_text)
+                print("---\n")
+                
+                # Queue for Farcaster (posted by the outbox drainer)
+                enqueue_notice(batch_id, start, end, text=post_text)
+                
+            except Exception as e:
+                print(f"✗ Batch/post error: {e}")
+                traceback.print_exc()
+        
+        elif should_post and count < 100:
+            print(f"⚠️ Patterns detected but insufficient data ({count}/100)")
+        else:
+            print("✓ Archive complete, no significant patterns detected")
+
+    except KeyboardInterrupt:
+        raise
+    except Exception as e:
+        print(f"✗ Job error: {e}")
+        traceback.print_exc()
+    
+    print("=== Complete ===\n")
+
+
+def run_cycle(scheduler=None, force_post=False):
+    """Run one archive cycle for every profile, fairly sharing the hub budget"""
+    
+    if scheduler is None:
+        scheduler = FairScheduler(load_profiles())
+    
+    governor.start_cycle(label=datetime.now().isoformat(timespec="seconds"))
+    
+    allocations = scheduler.allocate()
+    for profile, budget in allocations:
+        archive_job(force_post=force_post, profile=profile, budget=budget)
+    
+    # Long-window aggregates come from rollups, not raw rows
+    if not governor.defer_analysis("rollups"):
+        maintain(channels=list(dict.fromkeys([None] + [p["channel_id"] for p, _ in allocations])))
+    
+    print(f"🎛 Cycle usage: {governor.summary()}")
+
+
+def threshold_archive_job(should_post=False):
+    """Main archiving job (fixed BATCH_SIZE-pattern threshold, scheduler.py)"""
+    print(f"\n=== 文 Archive Job - {datetime.now()} ===")
+    
+    # Rows, counts and batches are scoped like the default profile's
+    channel = default_profile()["channel_id"]
+    
+    governor.start_cycle(label=datetime.now().isoformat(timespec="seconds"))
+
+    try:
+        # Fetch casts
+        casts = fetch_channel_casts()
+        if not casts:
+            print("No casts to process")
+            return
+
+        # Process with LLM
+        patterns = process_casts(casts, channel=channel)
+        
+        if not patterns:
+            print("⚠️ No patterns extracted")
+            return
+
+        # Save to database
+        save_patterns(patterns)
+
+        # Check unarchived count
+        count = get_unarchived_count(channel=channel)
+        print(f"Unarchived patterns: {count}")
+
+        # Post logic
+        if (should_post or TEST_POST) and count >= BATCH_SIZE:
+            end = count
+            start = max(0, end - BATCH_SIZE)
+            
+            try:
+                batch_id, digest = create_batch(start, end, channel=channel)
+                print(f"✓ Created batch {batch_id} ({start}–{end})")
+                
+                enqueue_notice(batch_id, start, end, text=notice_text(start, end, batch_id, digest))
+                
+            except Exception as e:
+                print(f"✗ Batch/post error: {e}")
+                
+        elif (should_post or TEST_POST) and count < BATCH_SIZE:
+            print(f"⚠️ Not enough patterns to post ({count}/{BATCH_SIZE})")
+
+    except KeyboardInterrupt:
+        raise
+    except Exception as e:
+        print(f"✗ Job error: {e}")
+        traceback.print_exc()
+    
+    print("=== Complete ===\n")
+
+
+def test_patterns(hours=12):
+    """Print the current significance check without posting"""
+    
+    analysis = analyze_recent_patterns(hours=hours)
+    if analysis:
+        is_sig, reasons, score = detect_pattern_significance(analysis)
+        print(f"Significant: {is_sig}")
+        print(f"Score: {score}")
+        print(f"Reasons:")
+        for r in reasons:
+            print(f"  - {r}")
+    else:
+        print("No patterns to analyze")
+    
+    return analysis
+
+
+def run_query(terms, days=None):
+    """Print patterns matching every entity term (see entity_index.query)"""
+    
+    from .entity_index import query
+    
+    since = (datetime.utcnow() - timedelta(days=days)).isoformat() if days else None
+    
+    started = time.time()
+    results = query(terms, since=since)
+    elapsed_ms = (time.time() - started) * 1000
+    
+    for cast_hash, timestamp in results:
+        print(f"{timestamp}  {cast_hash}")
+    print(f"\n{len(results)} patterns match {' + '.join(terms)} ({elapsed_ms:.0f} ms)")
+    
+    return results
+
+
+def run_forever(job, interval_hours=INTERVAL_HOURS):
+    """Run a job now and then every interval_hours until interrupted"""
+    
+    job()
+    
+    while True:
+        time.sleep(interval_hours * 3600)
+        job()
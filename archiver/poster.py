@@ -1,82 +1,122 @@
 import requests
-import os
 import json
+from .config import NEYNAR_API_KEY, FARCASTER_SIGNER_UUID, SUPABASE_URL, SUPABASE_KEY
+from .session import session
 
-NEYNAR_API_KEY = os.getenv('NEYNAR_API_KEY')
-FARCASTER_SIGNER_UUID = os.getenv('FARCASTER_SIGNER_UUID')
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
 
-def post_archive_notice(start, end, batch_id, custom_text=None):
-    """Post archive notice to Farcaster"""
-    
+def notice_text(start, end, batch_id, digest=None):
+    """Default archive notice (with the batch's Merkle root if digested)"""
+    total = digest["total"] if digest else end - start
+    text = f"""文 · batch {batch_id}
+
+{total} patterns
+#{start}–#{end}"""
+    if digest and digest.get("merkle_root"):
+        text += f"\nroot {digest['merkle_root'][:18]}"
+    return text
+
+
+def send_cast(text, idem=None):
+    """
+    Publish a cast through Neynar
+
+    Args:
+        text: cast text
+        idem: idempotency key; Neynar returns the original cast for a repeat
+
+    Returns: (cast_hash or None, error or None)
+    """
+
     url = "https://api.neynar.com/v2/farcaster/cast"
-    
+
     headers = {
         "accept": "application/json",
         "api_key": NEYNAR_API_KEY,
         "content-type": "application/json"
     }
-    
-    # Use custom text if provided, otherwise generate default
-    if custom_text:
-        text = custom_text
-    else:
-        total = end - start
-        text = f"""文 · batch {batch_id}
 
-{total} patterns
-#{start}–#{end}"""
-    
     payload = {
         "signer_uuid": FARCASTER_SIGNER_UUID,
         "text": text
     }
-    
+    if idem:
+        payload["idem"] = idem
+
     try:
         print(f"📤 Posting to Farcaster...")
-        
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        
+
+        response = session.post(url, json=payload, headers=headers, timeout=30)
+
         print(f"Status: {response.status_code}")
-        
+
         if response.status_code == 402:
             print("⚠️ Neynar requires payment - posting disabled")
-            return None
-        
+            return None, "payment required"
+
         if response.status_code not in [200, 201]:
             print(f"✗ Post failed: {response.text[:300]}")
-            return None
-        
+            return None, f"status {response.status_code}"
+
         # Parse response
         try:
             data = response.json()
             cast_hash = data['cast']['hash']
         except (KeyError, json.JSONDecodeError):
             print("⚠️ Response format unexpected")
-            return None
-        
+            return None, "unexpected response"
+
         print(f"✓ Posted: https://warpcast.com/~/conversations/{cast_hash}")
-        
-        # Update batch with cast_hash
-        batch_url = f"{SUPABASE_URL}/rest/v1/batches?id=eq.{batch_id}"
-        batch_headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        requests.patch(
-            batch_url, 
-            json={"cast_hash": cast_hash}, 
-            headers=batch_headers
-        )
-        
-        return cast_hash
-        
+        return cast_hash, None
+
     except requests.exceptions.Timeout:
         print("✗ Request timeout")
-        return None
+        return None, "timeout"
     except Exception as e:
         print(f"✗ Post error: {e}")
+        return None, str(e)
+
+
+def attach_cast_hash(batch_id, cast_hash):
+    """Record the notice's cast_hash on its batch; returns True on success"""
+
+    batch_url = f"{SUPABASE_URL}/rest/v1/batches?id=eq.{batch_id}"
+    batch_headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json"
+    }
+
+    try:
+        response = session.patch(
+            batch_url,
+            json={"cast_hash": cast_hash},
+            headers=batch_headers,
+            timeout=15
+        )
+        if response.status_code not in [200, 204]:
+            print(f"✗ Batch cast_hash update failed: {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"✗ Batch cast_hash update error: {e}")
+        return False
+
+    # recent_batches in the stats snapshot carry the cast_hash
+    from .db import update_stats_snapshot
+    update_stats_snapshot()
+    return True
+
+
+def post_archive_notice(start, end, batch_id, custom_text=None):
+    """Post archive notice to Farcaster (synchronously; see outbox.py for queued posting)"""
+
+    # Use custom text if provided, otherwise generate default
+    text = custom_text or notice_text(start, end, batch_id)
+
+    cast_hash, _ = send_cast(text, idem=f"wen-batch-{batch_id}")
+    if not cast_hash:
         return None
+
+    # Update batch with cast_hash
+    attach_cast_hash(batch_id, cast_hash)
+
+    return cast_hash
@@ -0,0 +1,118 @@
+"""
+profiles.py
+Archive profiles and fair scheduling across them
+
+A profile is one channel / FID set. All profiles run in one process and
+share the HTTP session, the extraction cache and the hub request budget;
+each keeps its own frontier, aggregates and batches.
+"""
+
+import json
+import os
+
+from .config import (
+    CHANNEL_ID,
+    CURATED_FIDS,
+    FRONTIER_STATE_FILE,
+    FETCH_REQUEST_BUDGET,
+    PROFILES_FILE
+)
+
+
+def default_profile():
+    """The single built-in profile (CHANNEL_ID + curated FIDs)"""
+    return {
+        "name": CHANNEL_ID.strip("/") or "default",
+        "channel_id": CHANNEL_ID,
+        "fids": list(CURATED_FIDS),
+        "parent_url": None,
+        "weight": 1,
+        "state_file": FRONTIER_STATE_FILE
+    }
+
+
+def load_profiles(path=PROFILES_FILE):
+    """
+    Load profiles from WEN_PROFILES_FILE, or fall back to the default
+
+    Returns: list of profile dicts
+    """
+
+    if not path:
+        return [default_profile()]
+
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Profiles file unreadable ({e}), using default profile")
+        return [default_profile()]
+
+    state_dir = os.path.dirname(FRONTIER_STATE_FILE)
+    profiles = []
+    seen = set()
+
+    for entry in raw:
+        name = entry.get("name") or entry.get("channel_id", "").strip("/")
+        if not name or name in seen:
+            print(f"⚠️ Skipping profile without unique name: {entry}")
+            continue
+        seen.add(name)
+
+        profiles.append({
+            "name": name,
+            "channel_id": entry.get("channel_id", f"/{name}"),
+            "fids": [int(fid) for fid in entry.get("fids", [])],
+            "parent_url": entry.get("parent_url"),
+            "weight": max(1, int(entry.get("weight", 1))),
+            "state_file": os.path.join(state_dir, f"frontier_state.{name}.json")
+        })
+
+    return profiles or [default_profile()]
+
+
+class FairScheduler:
+    """
+    Deficit round robin over profiles
+
+    Every cycle each profile earns budget * weight / total_weight hub
+    requests of deficit. The cycle's budget is then handed out one whole
+    request at a time to whichever profile is owed the most, so a cycle
+    never grants more than the budget, never grants nothing, and small
+    profiles still get their share over time. Ties follow a rotating
+    order so no profile is always last.
+    """
+
+    def __init__(self, profiles, budget=FETCH_REQUEST_BUDGET):
+        self.profiles = profiles
+        self.budget = budget
+        self.deficit = {p["name"]: 0.0 for p in profiles}
+        self.cycle = 0
+
+    def allocate(self):
+        """
+        Plan one cycle
+
+        Returns: list of (profile, request_budget) in run order
+        """
+
+        if not self.profiles:
+            return []
+
+        total_weight = sum(p["weight"] for p in self.profiles) or 1
+
+        shift = self.cycle % len(self.profiles)
+        order = self.profiles[shift:] + self.profiles[:shift]
+        self.cycle += 1
+
+        for profile in order:
+            self.deficit[profile["name"]] += self.budget * profile["weight"] / total_weight
+
+        granted = {p["name"]: 0 for p in order}
+        for _ in range(int(self.budget)):
+            # max() keeps the first of equal deficits, i.e. the rotated order
+            profile = max(order, key=lambda p: self.deficit[p["name"]])
+            self.deficit[profile["name"]] -= 1
+            granted[profile["name"]] += 1
+
+        return [(p, granted[p["name"]]) for p in order if granted[p["name"]]]
@@ -0,0 +1,193 @@
+"""
+reextract.py
+Versioned bulk re-extraction of the stored archive
+
+Streams patterns whose extractor_version is missing (old rows) or
+differs from the current EXTRACTOR_VERSION (including local regex
+extractions from shed or failed LLM calls), re-runs extraction in a thread pool within a token
+budget, and writes the new entities back in bulk. Progress is
+checkpointed by pattern id, so an interrupted or budget-limited run
+resumes where it stopped.
+
+Usage:
+  python -m archiver.reextract [--budget TOKENS] [--workers N] [--restart]
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from .config import (
+    SUPABASE_URL,
+    EXTRACTOR_VERSION,
+    REEXTRACT_WORKERS,
+    REEXTRACT_TOKEN_BUDGET,
+    REEXTRACT_CHECKPOINT_FILE,
+    PAGE_SIZE
+)
+from .db import headers, iter_pages
+from .session import session
+from .extractor import _extract, estimate_tokens
+from .entity_index import index_patterns
+from .rollup import recompute_hours
+
+def load_checkpoint(path=REEXTRACT_CHECKPOINT_FILE):
+    """Last processed id for the current extractor version (None = start)"""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if state.get("version") != EXTRACTOR_VERSION:
+        return None
+    return state.get("last_id")
+
+
+def save_checkpoint(last_id, path=REEXTRACT_CHECKPOINT_FILE):
+    with open(path, "w") as f:
+        json.dump({"version": EXTRACTOR_VERSION, "last_id": last_id}, f)
+
+
+def clear_checkpoint(path=REEXTRACT_CHECKPOINT_FILE):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def apply_entities(rows):
+    """
+    Write re-extracted entities back in one request
+
+    Uses the reextract_apply RPC (schema.sql), which updates entities and
+    extractor_version by id and drops the old postings; the entity index
+    is then rebuilt for these rows and the rollup hours they fall in are
+    recomputed, however old.
+
+    Returns: {"ok": bool, "index_failed": n}
+    """
+
+    if not rows:
+        return {"ok": True, "index_failed": 0}
+
+    payload = [
+        {"id": r["id"], "entities": r["entities"], "extractor_version": EXTRACTOR_VERSION}
+        for r in rows
+    ]
+
+    response = session.post(
+        f"{SUPABASE_URL}/rest/v1/rpc/reextract_apply",
+        json={"p_rows": payload},
+        headers=headers,
+        timeout=60
+    )
+    if response.status_code not in [200, 204]:
+        print(f"✗ Re-extraction write failed: {response.status_code} {response.text[:200]}")
+        return {"ok": False, "index_failed": 0}
+
+    # The old postings are gone; without the new ones these rows drop out of queries
+    indexed = index_patterns(rows)
+
+    # Hourly entity counts are built from the postings, so only once they are in
+    if indexed:
+        try:
+            recompute_hours([r.get("timestamp") for r in rows])
+        except Exception as e:
+            print(f"⚠️ Rollup recompute error: {e}")
+
+    return {"ok": True, "index_failed": 0 if indexed else len(rows)}
+
+
+def run(budget=REEXTRACT_TOKEN_BUDGET, workers=REEXTRACT_WORKERS, restart=False):
+    """
+    Re-extract stale patterns until done or out of budget
+
+    Returns: {"updated": n, "failed": n, "index_failed": n, "tokens": n, "done": bool}
+    """
+
+    if restart:
+        clear_checkpoint()
+
+    start_after = load_checkpoint()
+    stale = f"or=(extractor_version.is.null,extractor_version.neq.{quote(EXTRACTOR_VERSION, safe='')})"
+
+    totals = {"updated": 0, "failed": 0, "index_failed": 0, "tokens": 0, "done": False}
+
+    print(f"文 re-extraction to {EXTRACTOR_VERSION} (budget {budget} tokens, {workers} workers)")
+    if start_after:
+        print(f"✓ Resuming after id {start_after}")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for page in iter_pages(
+            "patterns",
+            # Pruned rows (rollup.prune_raw_content) have no text left to extract
+            filters=[stale, "content=not.is.null"],
+            select="id,cast_hash,content,timestamp,channel",
+            page_size=min(PAGE_SIZE, 200),
+            start_after=start_after
+        ):
+            # Trim the page to what the budget still allows
+            batch = []
+            out_of_budget = False
+            for row in page:
+                if not (row.get("content") or "").strip():
+                    continue
+                cost = estimate_tokens(row.get("content"))
+                if totals["tokens"] + cost > budget:
+                    out_of_budget = True
+                    break
+                totals["tokens"] += cost
+                batch.append(row)
+
+            results = list(pool.map(lambda r: _extract(r.get("content") or ""), batch))
+
+            updated = []
+            for row, (entities, ok) in zip(batch, results):
+                if ok:
+                    updated.append({**row, "entities": entities})
+                else:
+                    totals["failed"] += 1
+
+            applied = apply_entities(updated)
+            if not applied["ok"]:
+                print("✗ Stopping; rerun to resume from the last checkpoint")
+                return totals
+
+            totals["updated"] += len(updated)
+            totals["index_failed"] += applied["index_failed"]
+            if applied["index_failed"]:
+                print(f"⚠️ {applied['index_failed']} re-extracted patterns missing from the entity index; run: python -m archiver.entity_index --rebuild")
+            # A fully handled page (blank rows included) is checkpointed at its end
+            if not out_of_budget:
+                save_checkpoint(page[-1]["id"])
+            elif batch:
+                save_checkpoint(batch[-1]["id"])
+
+            print(f"✓ {totals['updated']} updated, {totals['failed']} failed, {totals['tokens']} tokens")
+
+            if out_of_budget:
+                print("⏸ Token budget reached; rerun to continue")
+                return totals
+
+    # Whole archive visited: next run starts over (and retries the failures)
+    clear_checkpoint()
+    totals["done"] = True
+    print("✓ Re-extraction complete")
+    return totals
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    budget = REEXTRACT_TOKEN_BUDGET
+    workers = REEXTRACT_WORKERS
+
+    if "--budget" in args:
+        budget = int(args[args.index("--budget") + 1])
+    if "--workers" in args:
+        workers = int(args[args.index("--workers") + 1])
+
+    try:
+        run(budget=budget, workers=workers, restart="--restart" in args)
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrupted; rerun to resume")
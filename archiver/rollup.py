@@ -0,0 +1,226 @@
+"""
+rollup.py
+Hourly and daily rollups of the archive, plus raw content retention
+
+Complete hours are compacted server-side (rollup_hours in schema.sql)
+into per-channel counts of volume, authors, hashtags, mentions and
+domains, each trimmed to ROLLUP_TOP_K per bucket. Long windows
+(30/90/365 days) are then answered from the daily table with one RPC
+instead of streaming raw patterns. Recent hours are recomputed on every
+run so late-arriving casts are picked up.
+
+Usage:
+  python -m archiver.rollup [--window DAYS] [--channel ID] [--no-prune]
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+
+from .config import (
+    SUPABASE_URL,
+    ROLLUP_TOP_K,
+    ROLLUP_RECOMPUTE_HOURS,
+    ROLLUP_WINDOWS,
+    RAW_CONTENT_RETENTION_DAYS
+)
+from .db import headers
+from .session import session
+from .governor import governor
+
+RPC_URL = f"{SUPABASE_URL}/rest/v1/rpc"
+
+# Hours compacted per RPC call (keeps each statement short)
+CHUNK_HOURS = 24
+
+
+def _rpc(name, params, timeout=60):
+    response = session.post(f"{RPC_URL}/{name}", json=params, headers=headers, timeout=timeout)
+    governor.charge("db")
+    response.raise_for_status()
+    return response.json() if response.content else None
+
+
+def _hour(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def _parse(value):
+    """Stored timestamp -> aware UTC datetime"""
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _edge(table, column, newest=False):
+    """Oldest (or newest) timestamp in a column, or None if the table is empty"""
+
+    order = "desc" if newest else "asc"
+    response = session.get(
+        f"{SUPABASE_URL}/rest/v1/{table}?select={column}&{column}=not.is.null&order={column}.{order}&limit=1",
+        headers=headers,
+        timeout=30
+    )
+    governor.charge("db")
+    response.raise_for_status()
+    rows = response.json()
+    if not rows:
+        return None
+    return _parse(rows[0][column])
+
+
+def compact(now=None):
+    """
+    Roll up every complete hour not yet compacted (and the recent ones again)
+
+    Returns: number of hourly rows written
+    """
+
+    end = _hour(now or datetime.now(timezone.utc))
+
+    last = _edge("pattern_rollups_hourly", "bucket", newest=True)
+    if last is None:
+        start = _edge("patterns", "timestamp")
+        if start is None:
+            return 0
+        start = _hour(start)
+    else:
+        start = min(last + timedelta(hours=1), end - timedelta(hours=ROLLUP_RECOMPUTE_HOURS))
+
+    written = 0
+    cursor = start
+    while cursor < end:
+        chunk_end = min(cursor + timedelta(hours=CHUNK_HOURS), end)
+        written += _rpc("rollup_hours", {
+            "p_from": cursor.isoformat(),
+            "p_to": chunk_end.isoformat(),
+            "p_top_k": ROLLUP_TOP_K
+        }) or 0
+        cursor = chunk_end
+
+    print(f"✓ Rolled up {start:%Y-%m-%d %H:00} → {end:%Y-%m-%d %H:00} ({written} hourly rows)")
+    return written
+
+
+def recompute_hours(timestamps):
+    """
+    Roll up again the compacted hours that rows with these timestamps fall in
+
+    Used after rows change in place (reextract), since compact() only
+    revisits the last ROLLUP_RECOMPUTE_HOURS. Hours newer than the last
+    compacted bucket are left to compact(), so its resume point never
+    jumps past hours it has not rolled up yet.
+
+    Returns: number of hourly rows written
+    """
+
+    last = _edge("pattern_rollups_hourly", "bucket", newest=True)
+    if last is None:
+        return 0
+
+    hours = sorted({_hour(_parse(ts)) for ts in timestamps if ts})
+    hours = [h for h in hours if h <= last]
+
+    # Consecutive hours go in one call
+    written = 0
+    i = 0
+    while i < len(hours):
+        j = i
+        while j + 1 < len(hours) and hours[j + 1] - hours[j] == timedelta(hours=1):
+            j += 1
+        written += _rpc("rollup_hours", {
+            "p_from": hours[i].isoformat(),
+            "p_to": (hours[j] + timedelta(hours=1)).isoformat(),
+            "p_top_k": ROLLUP_TOP_K
+        }) or 0
+        i = j + 1
+
+    return written
+
+
+def prune_raw_content(days=RAW_CONTENT_RETENTION_DAYS, now=None):
+    """
+    Drop the text of archived patterns older than the retention window
+
+    Off unless RAW_CONTENT_RETENTION_DAYS is set. Only rows already
+    rolled up, in a sealed batch, and covered by a verified export
+    (batches.exported_at / export_sha256) are touched.
+    Returns: number of patterns pruned
+    """
+
+    if not days:
+        return 0
+
+    before = (now or datetime.now(timezone.utc)) - timedelta(days=days)
+    pruned = _rpc("prune_raw_content", {"p_before": before.isoformat()}, timeout=300) or 0
+
+    if pruned:
+        print(f"✓ Pruned raw content of {pruned} patterns older than {days}d")
+    return pruned
+
+
+def window_summary(days, channel=None, limit=10, now=None):
+    """
+    Top entities over the last N days from the daily rollups
+
+    Returns the same keys as analyze_recent_patterns where they can be
+    summed (total, trending_hashtags, trending_mentions, top_authors,
+    top_domains, timeframe_hours, timestamp).
+    """
+
+    now = now or datetime.now(timezone.utc)
+    since = (now - timedelta(days=days)).date()
+
+    kinds = _rpc("rollup_window", {
+        "p_since": since.isoformat(),
+        "p_channel": channel,
+        "p_limit": limit
+    }) or {}
+
+    def top(kind, prefix=""):
+        return [(f"{prefix}{entity}", count) for entity, count in kinds.get(kind, [])]
+
+    volume = kinds.get("volume", [])
+    total = volume[0][1] if volume else 0
+
+    return {
+        "total": total,
+        "avg_per_hour": round(total / (days * 24), 1),
+        "trending_hashtags": top("hashtag", "#"),
+        "trending_mentions": top("mention", "@"),
+        "top_authors": [(int(fid), count) for fid, count in kinds.get("author", [])],
+        "top_domains": top("domain"),
+        "timeframe_hours": days * 24,
+        "timestamp": now.isoformat()
+    }
+
+
+def maintain(channels=(None,), prune=True):
+    """Compact, apply retention, and refresh long windows in the stats snapshot"""
+
+    from .db import update_stats_window
+
+    try:
+        compact()
+        if prune:
+            prune_raw_content()
+
+        for channel in channels:
+            for days in ROLLUP_WINDOWS:
+                update_stats_window(window_summary(days, channel=channel), channel=channel)
+    except Exception as e:
+        print(f"⚠️ Rollup maintenance error: {e}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    channel = args[args.index("--channel") + 1] if "--channel" in args else None
+
+    if "--window" in args:
+        days = int(args[args.index("--window") + 1])
+        summary = window_summary(days, channel=channel)
+        print(f"\n=== Last {days} days ({summary['total']} patterns) ===")
+        print(f"Hashtags: {summary['trending_hashtags']}")
+        print(f"Mentions: {summary['trending_mentions']}")
+        print(f"Domains: {summary['top_domains']}")
+        print(f"Authors: {summary['top_authors']}")
+    else:
+        maintain(channels=(channel,), prune="--no-prune" not in args)
@@ -0,0 +1,371 @@
+-- 文 archiver schema additions
+-- Apply in the Supabase SQL editor, in order. Each block is idempotent.
+
+-- Profiles: patterns and batches are scoped to a channel
+alter table patterns add column if not exists channel text;
+alter table batches add column if not exists channel text;
+update patterns set channel = '/base' where channel is null;
+update batches set channel = '/base' where channel is null;
+create index if not exists patterns_channel_batch_idx on patterns (channel, batch_id);
+create index if not exists patterns_channel_timestamp_idx on patterns (channel, timestamp);
+
+-- Bulk inserts: on_conflict=cast_hash needs a unique key
+create unique index if not exists patterns_cast_hash_key on patterns (cast_hash);
+
+-- Inverted entity index (entity_index.py), filled by save_patterns
+create table if not exists entity_postings (
+    id bigserial unique,
+    kind text not null,           -- hashtag | mention | domain
+    entity text not null,         -- normalized: lowercase, no #/@
+    cast_hash text not null,
+    timestamp timestamptz,
+    channel text,
+    primary key (kind, entity, cast_hash)
+);
+create index if not exists entity_postings_lookup_idx on entity_postings (kind, entity, timestamp);
+
+-- Near-duplicate clusters (dedup.py): representative cast_hash per cluster
+alter table patterns add column if not exists cluster_id text;
+
+-- Stats snapshot (api/stats.js reads this one row instead of counting)
+-- Counters move inside the same transaction as the writes from
+-- save_patterns (insert) and create_batch (batch_id update).
+create table if not exists archive_stats (
+    id int primary key default 1 check (id = 1),
+    total_patterns bigint not null default 0,
+    unarchived bigint not null default 0,
+    batch_size int not null default 500,
+    window_aggregates jsonb,
+    recent_batches jsonb,
+    updated_at timestamptz not null default now()
+);
+insert into archive_stats (id, total_patterns, unarchived)
+select 1, count(*), count(*) filter (where batch_id is null) from patterns
+on conflict (id) do nothing;
+
+create or replace function archive_stats_on_insert() returns trigger language plpgsql as $$
+begin
+    update archive_stats set
+        total_patterns = total_patterns + (select count(*) from new_rows),
+        unarchived = unarchived + (select count(*) from new_rows where batch_id is null),
+        updated_at = now()
+    where id = 1;
+    return null;
+end $$;
+
+create or replace function archive_stats_on_update() returns trigger language plpgsql as $$
+begin
+    update archive_stats set
+        unarchived = unarchived
+            - (select count(*) from old_rows where batch_id is null)
+            + (select count(*) from new_rows where batch_id is null),
+        updated_at = now()
+    where id = 1;
+    return null;
+end $$;
+
+create or replace function archive_stats_on_delete() returns trigger language plpgsql as $$
+begin
+    update archive_stats set
+        total_patterns = total_patterns - (select count(*) from old_rows),
+        unarchived = unarchived - (select count(*) from old_rows where batch_id is null),
+        updated_at = now()
+    where id = 1;
+    return null;
+end $$;
+
+drop trigger if exists archive_stats_insert on patterns;
+create trigger archive_stats_insert after insert on patterns
+    referencing new table as new_rows
+    for each statement execute function archive_stats_on_insert();
+
+drop trigger if exists archive_stats_update on patterns;
+-- Transition tables are not allowed with a column list (update of ...),
+-- so this fires on every update; unchanged batch_ids net out to zero.
+create trigger archive_stats_update after update on patterns
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function archive_stats_on_update();
+
+drop trigger if exists archive_stats_delete on patterns;
+create trigger archive_stats_delete after delete on patterns
+    referencing old table as old_rows
+    for each statement execute function archive_stats_on_delete();
+
+-- Merge one window's aggregates into the snapshot (db.update_stats_window)
+create or replace function archive_stats_set_window(p_key text, p_value jsonb) returns void
+language sql as $$
+    update archive_stats set
+        window_aggregates = coalesce(window_aggregates, '{}'::jsonb) || jsonb_build_object(p_key, p_value),
+        updated_at = now()
+    where id = 1;
+$$;
+
+-- Archive notice outbox (outbox.py): one row per batch, batch_id is the idempotency key
+create table if not exists post_outbox (
+    batch_id bigint primary key references batches (id),
+    text text not null,
+    status text not null default 'pending',   -- pending | sending | sent | failed
+    attempts int not null default 0,
+    next_attempt_at timestamptz not null default now(),
+    cast_hash text,
+    last_error text,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+create index if not exists post_outbox_due_idx on post_outbox (status, next_attempt_at);
+
+-- Extractor versions (config.EXTRACTOR_VERSION) and bulk re-extraction (reextract.py)
+alter table patterns add column if not exists extractor_version text;
+create index if not exists patterns_extractor_version_idx on patterns (extractor_version);
+
+create or replace function reextract_apply(p_rows jsonb) returns void
+language sql as $$
+    delete from entity_postings
+    where cast_hash in (
+        select p.cast_hash from patterns p
+        join jsonb_to_recordset(p_rows) as r(id bigint) on r.id = p.id
+    );
+    update patterns p set
+        entities = r.entities,
+        extractor_version = r.extractor_version
+    from jsonb_to_recordset(p_rows) as r(id bigint, entities jsonb, extractor_version text)
+    where p.id = r.id;
+$$;
+
+-- Author display data from hub userDataByFid (authors.py)
+alter table patterns add column if not exists author_display_name text;
+
+-- Hourly / daily rollups (rollup.py): per channel, top-k per kind
+-- kind: volume (entity '') | author (fid) | hashtag | mention | domain
+create table if not exists pattern_rollups_hourly (
+    bucket timestamptz not null,
+    channel text not null,
+    kind text not null,
+    entity text not null,
+    count int not null,
+    primary key (bucket, channel, kind, entity)
+);
+create table if not exists pattern_rollups_daily (
+    bucket date not null,
+    channel text not null,
+    kind text not null,
+    entity text not null,
+    count int not null,
+    primary key (bucket, channel, kind, entity)
+);
+
+-- Recompute hours in [p_from, p_to) from raw rows, then the days they touch
+-- (daily counts are summed from the trimmed hourly rows)
+create or replace function rollup_hours(p_from timestamptz, p_to timestamptz, p_top_k int)
+returns int language plpgsql as $$
+declare
+    n int;
+begin
+    delete from pattern_rollups_hourly where bucket >= p_from and bucket < p_to;
+
+    insert into pattern_rollups_hourly (bucket, channel, kind, entity, count)
+    select bucket, channel, kind, entity, count from (
+        select c.*, row_number() over (
+            partition by bucket, channel, kind order by count desc, entity
+        ) as rn
+        from (
+            select date_trunc('hour', timestamp) as bucket, coalesce(channel, '/base') as channel,
+                   kind, entity, count(*)::int as count
+            from entity_postings
+            where timestamp >= p_from and timestamp < p_to
+            group by 1, 2, 3, 4
+            union all
+            select date_trunc('hour', timestamp), coalesce(channel, '/base'),
+                   'author', author_fid::text, count(*)::int
+            from patterns
+            where timestamp >= p_from and timestamp < p_to
+            group by 1, 2, 4
+            union all
+            select date_trunc('hour', timestamp), coalesce(channel, '/base'),
+                   'volume', '', count(*)::int
+            from patterns
+            where timestamp >= p_from and timestamp < p_to
+            group by 1, 2
+        ) c
+    ) r
+    where rn <= p_top_k;
+    get diagnostics n = row_count;
+
+    delete from pattern_rollups_daily
+    where bucket >= (p_from at time zone 'utc')::date and bucket <= (p_to at time zone 'utc')::date;
+
+    insert into pattern_rollups_daily (bucket, channel, kind, entity, count)
+    select bucket, channel, kind, entity, count from (
+        select d.*, row_number() over (
+            partition by bucket, channel, kind order by count desc, entity
+        ) as rn
+        from (
+            select (bucket at time zone 'utc')::date as bucket, channel, kind, entity, sum(count)::int as count
+            from pattern_rollups_hourly
+            where bucket >= date_trunc('day', p_from at time zone 'utc') at time zone 'utc'
+              and bucket < (date_trunc('day', p_to at time zone 'utc') + interval '1 day') at time zone 'utc'
+            group by 1, 2, 3, 4
+        ) d
+    ) r
+    where rn <= p_top_k;
+
+    return n;
+end $$;
+
+-- Top entities per kind over a window, summed from daily rollups
+create or replace function rollup_window(p_since date, p_channel text default null, p_limit int default 10)
+returns jsonb language sql stable as $$
+    with agg as (
+        select kind, entity, sum(count) as count
+        from pattern_rollups_daily
+        where bucket >= p_since and (p_channel is null or channel = p_channel)
+        group by kind, entity
+    ), ranked as (
+        select *, row_number() over (partition by kind order by count desc, entity) as rn
+        from agg
+    )
+    select coalesce(jsonb_object_agg(kind, items), '{}'::jsonb) from (
+        select kind, jsonb_agg(jsonb_build_array(entity, count) order by count desc, entity) as items
+        from ranked
+        where rn <= p_limit
+        group by kind
+    ) k;
+$$;
+
+-- Raw content retention: archived rows older than p_before whose hour is
+-- already rolled up keep their metadata and entities, not the text.
+-- Only batches whose export was read back and verified (batch_export.py
+-- sets exported_at / export_sha256) are pruned; the export keeps the text.
+alter table batches add column if not exists exported_at timestamptz;
+alter table batches add column if not exists export_sha256 text;
+
+create or replace function prune_raw_content(p_before timestamptz) returns int
+language plpgsql as $$
+declare
+    n int;
+begin
+    update patterns p set content = null
+    from batches b
+    where b.id = p.batch_id
+      and b.exported_at is not null
+      and b.export_sha256 is not null
+      and p.content is not null
+      and p.timestamp < least(p_before, (select max(bucket) from pattern_rollups_hourly));
+    get diagnostics n = row_count;
+    return n;
+end $$;
+
+-- Batch digest (digest.py), computed by create_batch from the claimed rows
+alter table batches add column if not exists digest jsonb;
+alter table batches add column if not exists merkle_root text;
+
+-- Entity query intersection (entity_index.query): only matches leave the database
+create or replace function entity_query(
+    p_terms jsonb,
+    p_since timestamptz default null,
+    p_until timestamptz default null,
+    p_channel text default null,
+    p_limit int default 1000
+) returns table (cast_hash text, "timestamp" timestamptz)
+language sql stable as $$
+    with terms as (
+        select distinct kind, entity from jsonb_to_recordset(p_terms) as t(kind text, entity text)
+    )
+    select e.cast_hash, min(e.timestamp) as "timestamp"
+    from entity_postings e
+    join terms t on e.kind = t.kind and e.entity = t.entity
+    where (p_since is null or e.timestamp >= p_since)
+      and (p_until is null or e.timestamp < p_until)
+      and (p_channel is null or e.channel = p_channel)
+    group by e.cast_hash
+    having count(*) = (select count(*) from terms)
+    order by 2, 1
+    limit p_limit;
+$$;
+
+-- Deduplicated analysis stream (pattern_analyzer.analyze_recent_patterns)
+-- Rows since p_since, keeping only the first (lowest id) member of each
+-- near-duplicate cluster in the window. Inlined by the planner, so the
+-- caller's id=gt / order / limit keyset applies to it directly.
+create index if not exists patterns_cluster_idx on patterns (cluster_id, id);
+
+create or replace function analysis_patterns(
+    p_since timestamptz,
+    p_channel text default null
+) returns setof patterns
+language sql stable as $$
+    select p.* from patterns p
+    where p.timestamp >= p_since
+      and (p_channel is null or p.channel = p_channel)
+      and (p.cluster_id is null or not exists (
+          select 1 from patterns q
+          where q.cluster_id = p.cluster_id
+            and q.id < p.id
+            and q.timestamp >= p_since
+            and (p_channel is null or q.channel = p_channel)
+      ));
+$$;
+
+-- Outbox reconciliation (outbox.drain_outbox)
+-- Sealed batches with no notice queued and no cast posted: the process
+-- died between create_batch and enqueue_notice. Only batches newer than
+-- the first queued notice count (older ones predate the outbox), and
+-- only once p_grace_seconds have passed, so a live archive_job gets to
+-- queue its own text first. A batch without a Merkle root never had its
+-- rows digested, so it is not announced.
+alter table batches add column if not exists created_at timestamptz not null default now();
+
+create or replace function unqueued_batches(p_grace_seconds int default 600, p_limit int default 10)
+returns table (id bigint, start_entry bigint, end_entry bigint, digest jsonb)
+language sql stable as $$
+    select b.id, b.start_entry::bigint, b.end_entry::bigint, b.digest
+    from batches b
+    where b.cast_hash is null
+      and b.merkle_root is not null
+      and b.id > (select coalesce(min(batch_id), 9223372036854775807) from post_outbox)
+      and b.created_at < now() - make_interval(secs => p_grace_seconds)
+      and not exists (select 1 from post_outbox o where o.batch_id = b.id)
+    order by b.id
+    limit p_limit;
+$$;
+
+-- Seal a batch in one transaction (db.create_batch): insert the batch row
+-- and claim up to p_limit unarchived rows. Claiming nothing raises, which
+-- rolls the insert back, so no empty batch is ever left to be announced.
+-- total_patterns is the number of rows actually claimed.
+create or replace function seal_batch(
+    p_start bigint,
+    p_end bigint,
+    p_channel text default null,
+    p_limit int default 500
+) returns jsonb
+language plpgsql as $$
+declare
+    v_batch bigint;
+    v_rows jsonb;
+begin
+    insert into batches (start_entry, end_entry, total_patterns, channel)
+    values (p_start, p_end, 0, p_channel)
+    returning id into v_batch;
+
+    with claimed as (
+        update patterns p set batch_id = v_batch
+        where p.id in (
+            select id from patterns
+            where batch_id is null
+              and (p_channel is null or channel = p_channel)
+            order by id
+            limit p_limit
+            for update skip locked
+        )
+        returning p.id, p.cast_hash, p.author_fid, p.entities, p.timestamp
+    )
+    select coalesce(jsonb_agg(to_jsonb(c) order by c.id), '[]'::jsonb) into v_rows from claimed;
+
+    if jsonb_array_length(v_rows) = 0 then
+        raise exception 'no unarchived patterns to seal';
+    end if;
+
+    update batches set total_patterns = jsonb_array_length(v_rows) where id = v_batch;
+    return jsonb_build_object('batch_id', v_batch, 'rows', v_rows);
+end $$;
@@ -3,8 +3,9 @@ scraper.py
 Fetch casts from target FIDs using Pinata Hub (free, no auth needed)
 """
 
-import requests
 import time
+from .session import session
+from .timestamps import from_hub
 
 PINATA_HUB = "https://hub.pinata.cloud"
 
@@ -20,7 +21,7 @@ def fetch_casts_from_fid(fid, limit=20):
     }
     
     try:
-        response = requests.get(url, params=params, timeout=15)
+        response = session.get(url, params=params, timeout=15)
         response.raise_for_status()
         
         data = response.json()
@@ -35,7 +36,9 @@ def fetch_casts_from_fid(fid, limit=20):
                 casts.append({
                     'hash': msg.get('hash', ''),
                     'text': cast_data.get('text', ''),
-                    'timestamp': msg.get('data', {}).get('timestamp', ''),
+                    # Hub seconds -> ISO UTC, the archive's only representation
+                    'timestamp': from_hub(msg.get('data', {}).get('timestamp')),
+                    'parent_url': cast_data.get('parentUrl'),
                     'author': {
                         'fid': fid_data,
                         'username': f"fid-{fid_data}"
@@ -51,53 +54,73 @@ def fetch_casts_from_fid(fid, limit=20):
         return []
 
 
-def fetch_channel_casts(limit=50):
-    """Fetch from curated FIDs + auto-detected active ones"""
+def fetch_channel_casts(limit=50, budget=None, profile=None):
+    """
+    Fetch from the FID frontier (curated + auto-detected active ones)
+
+    The frontier decides which FIDs to poll and how deep, within a
+    global request budget, ranked by expected new casts per request.
+    With a profile, its FID set and frontier state are used and casts
+    can be restricted to the profile's channel parent_url.
+    """
     
-    # Your curated high-quality FIDs
-    curated_fids = [
-        12, 194, 1020, 2904, 446697, 1725, 5406, 11388,
-        2802, 4167, 2210, 9933, 210698, 7143, 190000,
-        864405, 5774, 12152, 4528, 13121, 99, 1606,
-        3621, 18723, 436577
-    ]
+    from .frontier import get_frontier
+    from .governor import governor
+    from .config import FETCH_REQUEST_BUDGET, MIN_FETCH_DEPTH
     
     # Try to get active FIDs from pattern analyzer
     try:
-        from pattern_analyzer import get_active_fids
-        active_fids = get_active_fids(hours=24, min_casts=3)
+        from .pattern_analyzer import get_active_fids
+        channel = profile["channel_id"] if profile else None
+        active_fids = get_active_fids(hours=24, min_casts=3, channel=channel)
     except:
         active_fids = []
     
-    # Combine (curated first, then active, dedupe)
-    target_fids = []
-    seen = set()
+    frontier = get_frontier(active_fids, profile=profile)
     
-    for fid in curated_fids:
-        if fid not in seen:
-            target_fids.append(fid)
-            seen.add(fid)
+    # Never plan past what the cycle's hub budget has left
+    budget = budget or FETCH_REQUEST_BUDGET
+    remaining = governor.remaining("hub")
+    if remaining is not None and remaining < budget:
+        governor.note("hub budget capped", requested=budget, granted=remaining)
+        budget = remaining
     
-    for fid in active_fids:
-        if fid not in seen and len(target_fids) < 30:  # max 30 FIDs
-            target_fids.append(fid)
-            seen.add(fid)
+    plan = frontier.plan(limit, budget=budget) if budget else []
     
-    all_casts = []
-    per_fid = max(2, min(10, limit // len(target_fids)))
+    # Below-median expected yield is what the governor shallows first
+    expected = sorted(frontier.expected_new(fid) for fid, _ in plan)
+    median = expected[len(expected) // 2] if expected else 0
     
-    print(f"✓ Fetching from {len(target_fids)} FIDs ({per_fid} casts each)")
+    print(f"✓ Fetching from {len(plan)}/{len(frontier.stats)} FIDs ({sum(d for _, d in plan)} casts requested)")
+    
+    all_casts = []
+    total_new = 0
     
-    for i, fid in enumerate(target_fids):
-        casts = fetch_casts_from_fid(fid, limit=per_fid)
+    for i, (fid, depth) in enumerate(plan):
+        if not governor.allow("hub"):
+            governor.note("fetch stopped", skipped_fids=len(plan) - i)
+            break
+        
+        depth = governor.scrape_depth(fid, depth, frontier.expected_new(fid) < median, MIN_FETCH_DEPTH)
+        casts = fetch_casts_from_fid(fid, limit=depth)
+        governor.charge("hub")
+        new_count = frontier.record(fid, casts, depth=depth)
+        total_new += new_count
         
         if casts:
-            print(f"✓ fid {fid}: {len(casts)} casts")
+            print(f"✓ fid {fid}: {len(casts)} casts ({new_count} new)")
             all_casts.extend(casts)
         
         # Rate limiting (be nice to free API)
         time.sleep(0.3)
     
+    frontier.save()
+    
+    # Keep only casts posted in the profile's channel
+    parent_url = profile.get("parent_url") if profile else None
+    if parent_url:
+        all_casts = [c for c in all_casts if c.get('parent_url') == parent_url]
+    
     # Deduplicate by hash
     seen_hashes = set()
     unique_casts = []
@@ -107,7 +130,11 @@ def fetch_channel_casts(limit=50):
             unique_casts.append(cast)
             seen_hashes.add(cast['hash'])
     
-    print(f"✓ total casts archived: {len(unique_casts)}")
+    # Drop casts already in the store before they cost an extraction
+    from .bloom import drop_known
+    unique_casts = drop_known(unique_casts)
+    
+    print(f"✓ total casts archived: {len(unique_casts)} ({total_new} new across {len(plan)} requests)")
     
     return unique_casts
 
@@ -0,0 +1,17 @@
+"""
+session.py
+Shared HTTP session for hub, LLM and database calls
+
+One keep-alive connection pool per host, reused by every profile
+running in the process instead of a fresh connection per request.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from .config import HTTP_POOL_SIZE
+
+session = requests.Session()
+
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_SIZE)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
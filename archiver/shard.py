@@ -0,0 +1,424 @@
+"""
+shard.py
+Coordinator / worker mode: ingestion sharded across processes or nodes
+
+The coordinator plans fetches with the FID frontier and enqueues one task
+per FID. FIDs map to partitions, partitions map to live workers on a
+consistent hash ring, and every worker runs scrape + extract + save for
+the partitions it owns. Workers hold heartbeat leases; when a lease
+expires the ring is rebuilt without that worker and its partitions (and
+any tasks it had claimed) move to the survivors.
+
+The queue is SQLite (WAL) so it works with no extra services. WAL needs
+shared memory, so every process must be on the same host (not on a
+network filesystem); spanning machines needs a server-backed queue.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+
+from .config import (
+    SHARD_DB_FILE,
+    SHARD_PARTITIONS,
+    SHARD_LEASE_SECONDS,
+    SHARD_MAX_ATTEMPTS,
+    SHARD_MIN_EXPECTED_NEW,
+    SHARD_VNODES,
+    FETCH_LIMIT
+)
+
+
+def _hash(key):
+    """Stable 64-bit hash (same on every process and machine)"""
+    return int.from_bytes(hashlib.md5(str(key).encode()).digest()[:8], "big")
+
+
+def partition_of(fid):
+    """Partition a FID belongs to"""
+    return _hash(f"fid:{fid}") % SHARD_PARTITIONS
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, nodes, vnodes=SHARD_VNODES):
+        self.ring = sorted(
+            (_hash(f"{node}#{i}"), node)
+            for node in nodes
+            for i in range(vnodes)
+        )
+        self.keys = [h for h, _ in self.ring]
+
+    def owner(self, key):
+        """Node responsible for a key (None if the ring is empty)"""
+        if not self.ring:
+            return None
+        i = bisect.bisect(self.keys, _hash(key)) % len(self.ring)
+        return self.ring[i][1]
+
+
+class WorkQueue:
+    """
+    SQLite-backed task queue with worker leases
+
+    Tables:
+        workers  worker_id, lease_until
+        tasks    one fetch (fid, depth) for a profile, claimed under a lease;
+                 a failed run is released back to pending with a backoff
+    """
+
+    def __init__(self, path=SHARD_DB_FILE):
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                lease_until REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                partition INTEGER NOT NULL,
+                fid INTEGER NOT NULL,
+                depth INTEGER NOT NULL,
+                profile TEXT,
+                channel TEXT,
+                parent_url TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker_id TEXT,
+                lease_until REAL,
+                result TEXT
+            );
+            CREATE INDEX IF NOT EXISTS tasks_status_partition_idx
+                ON tasks (status, partition);
+        """)
+
+        # Queues created before failed tasks were released
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")}
+        if "attempts" not in columns:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        if "not_before" not in columns:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN not_before REAL")
+
+    # Workers
+
+    def heartbeat(self, worker_id):
+        """Register / renew a worker lease and the leases of its claimed tasks"""
+        lease_until = time.time() + SHARD_LEASE_SECONDS
+        self.conn.execute(
+            "INSERT INTO workers (worker_id, lease_until) VALUES (?, ?) "
+            "ON CONFLICT(worker_id) DO UPDATE SET lease_until = excluded.lease_until",
+            (worker_id, lease_until)
+        )
+        self.conn.execute(
+            "UPDATE tasks SET lease_until = ? WHERE worker_id = ? AND status = 'claimed'",
+            (lease_until, worker_id)
+        )
+
+    def leave(self, worker_id):
+        """Drop a worker immediately (clean shutdown)"""
+        self.conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def live_workers(self):
+        """Workers whose lease has not expired"""
+        rows = self.conn.execute(
+            "SELECT worker_id FROM workers WHERE lease_until > ?", (time.time(),)
+        )
+        return sorted(r[0] for r in rows)
+
+    def owned_partitions(self, worker_id):
+        """Partitions the ring assigns to this worker"""
+        ring = HashRing(self.live_workers())
+        return [p for p in range(SHARD_PARTITIONS) if ring.owner(p) == worker_id]
+
+    # Tasks
+
+    def enqueue(self, fid, depth, profile=None):
+        """Queue a fetch unless one is already open for this FID/profile"""
+        name = profile["name"] if profile else None
+        open_task = self.conn.execute(
+            "SELECT 1 FROM tasks WHERE fid = ? AND profile IS ? AND status != 'done'",
+            (fid, name)
+        ).fetchone()
+        if open_task:
+            return False
+
+        self.conn.execute(
+            "INSERT INTO tasks (partition, fid, depth, profile, channel, parent_url) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                partition_of(fid), fid, depth, name,
+                profile["channel_id"] if profile else None,
+                profile.get("parent_url") if profile else None
+            )
+        )
+        return True
+
+    def claim(self, worker_id, limit=1):
+        """
+        Claim pending tasks (or tasks whose lease expired) in owned partitions
+
+        One at a time by default: a task must finish within one lease, and
+        tasks waiting behind it in the same claim would not be renewed.
+
+        Returns: list of task dicts
+        """
+
+        partitions = self.owned_partitions(worker_id)
+        if not partitions:
+            return []
+
+        now = time.time()
+        marks = ",".join("?" * len(partitions))
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                f"SELECT id, fid, depth, profile, channel, parent_url FROM tasks "
+                f"WHERE partition IN ({marks}) AND "
+                f"((status = 'pending' AND (not_before IS NULL OR not_before <= ?)) "
+                f"OR (status = 'claimed' AND lease_until < ?)) "
+                f"ORDER BY id LIMIT ?",
+                (*partitions, now, now, limit)
+            ).fetchall()
+
+            for row in rows:
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'claimed', worker_id = ?, lease_until = ? "
+                    "WHERE id = ?",
+                    (worker_id, now + SHARD_LEASE_SECONDS, row[0])
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        keys = ("id", "fid", "depth", "profile", "channel", "parent_url")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def complete(self, task_id, worker_id, result):
+        """
+        Mark a claimed task done
+
+        Returns: False if the lease had already moved to another worker
+        """
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = 'done', result = ? "
+            "WHERE id = ? AND worker_id = ? AND status = 'claimed'",
+            (json.dumps(result), task_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def release(self, task_id, worker_id):
+        """
+        Hand a failed task back to the queue
+
+        Heartbeats keep a claimed task's lease alive, so a failed run has
+        to be released explicitly. It becomes pending again after an
+        exponential backoff; after SHARD_MAX_ATTEMPTS runs it is dropped
+        and the coordinator plans the FID afresh.
+
+        Returns: False if the task was no longer this worker's
+        """
+
+        row = self.conn.execute(
+            "SELECT attempts FROM tasks WHERE id = ? AND worker_id = ? AND status = 'claimed'",
+            (task_id, worker_id)
+        ).fetchone()
+        if not row:
+            return False
+
+        attempts = row[0] + 1
+        if attempts >= SHARD_MAX_ATTEMPTS:
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            return True
+
+        backoff = min(SHARD_LEASE_SECONDS, 30 * 2 ** attempts)
+        self.conn.execute(
+            "UPDATE tasks SET status = 'pending', worker_id = NULL, lease_until = NULL, "
+            "attempts = ?, not_before = ? WHERE id = ?",
+            (attempts, time.time() + backoff, task_id)
+        )
+        return True
+
+    def collect(self):
+        """
+        Pop finished tasks
+
+        Returns: list of (fid, profile, result)
+        """
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                "SELECT id, fid, profile, result FROM tasks WHERE status = 'done'"
+            ).fetchall()
+            self.conn.executemany("DELETE FROM tasks WHERE id = ?", [(r[0],) for r in rows])
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return [(fid, profile, json.loads(result or "{}")) for _, fid, profile, result in rows]
+
+    def pending_count(self):
+        """Tasks not yet finished"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status != 'done'"
+        ).fetchone()[0]
+
+
+def run_coordinator(interval_seconds, limit=FETCH_LIMIT, once=False):
+    """
+    Plan fetches with the frontier and keep the queue fed
+
+    Results from finished tasks are fed back into each profile's
+    frontier before the next plan. A FID is only queued once it is
+    expected to have at least SHARD_MIN_EXPECTED_NEW new casts, so a
+    short interval does not turn into a hub request per FID per round.
+    """
+
+    from .frontier import get_frontier
+    from .profiles import load_profiles, FairScheduler
+
+    queue = WorkQueue()
+    profiles = load_profiles()
+    by_name = {p["name"]: p for p in profiles}
+    scheduler = FairScheduler(profiles)
+
+    print(f"文 coordinator: {len(profiles)} profiles, {SHARD_PARTITIONS} partitions")
+
+    while True:
+        # Feed results back into the frontiers
+        done = queue.collect()
+        frontiers = {}
+        for fid, name, result in done:
+            profile = by_name.get(name)
+            if not profile:
+                continue
+            if name not in frontiers:
+                frontiers[name] = get_frontier(profile=profile)
+            casts = [{"timestamp": ts} for ts in result.get("timestamps", [])]
+            frontiers[name].record(fid, casts, depth=result.get("depth"))
+        for frontier in frontiers.values():
+            frontier.save()
+
+        # Plan the next round
+        queued = 0
+        for profile, budget in scheduler.allocate():
+            frontier = frontiers.get(profile["name"]) or get_frontier(profile=profile)
+            for fid, depth in frontier.plan(limit, budget=budget):
+                if frontier.expected_new(fid) < SHARD_MIN_EXPECTED_NEW:
+                    continue
+                if queue.enqueue(fid, depth, profile):
+                    queued += 1
+
+        workers = queue.live_workers()
+        print(f"✓ collected {len(done)}, queued {queued}, open {queue.pending_count()}, workers {len(workers)}")
+
+        if once:
+            return
+        time.sleep(interval_seconds)
+
+
+def run_worker(worker_id=None, idle_seconds=5):
+    """Claim and run tasks for owned partitions until interrupted"""
+
+    from .scraper import fetch_casts_from_fid
+    from .extractor import process_casts
+    from .db import save_patterns
+    from .bloom import drop_known
+
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    queue = WorkQueue()
+
+    print(f"文 worker {worker_id} started")
+
+    try:
+        while True:
+            queue.heartbeat(worker_id)
+            tasks = queue.claim(worker_id)
+
+            if not tasks:
+                time.sleep(idle_seconds)
+                continue
+
+            for task in tasks:
+                try:
+                    casts = fetch_casts_from_fid(task["fid"], limit=task["depth"])
+                    timestamps = [c["timestamp"] for c in casts if c.get("timestamp")]
+
+                    if task["parent_url"]:
+                        casts = [c for c in casts if c.get("parent_url") == task["parent_url"]]
+
+                    # Already-archived casts never reach extraction
+                    casts = drop_known(casts) if casts else []
+
+                    patterns = process_casts(casts, channel=task["channel"]) if casts else []
+                    saved = save_patterns(patterns)
+                except Exception as e:
+                    print(f"✗ fid {task['fid']}: {e}")
+                    saved = False
+
+                if not saved:
+                    # Back to the queue with a backoff (the heartbeat would keep it claimed)
+                    queue.release(task["id"], worker_id)
+                    print(f"⚠️ fid {task['fid']}: save failed, task released for retry")
+                elif not queue.complete(task["id"], worker_id, {"timestamps": timestamps, "depth": task["depth"]}):
+                    print(f"⚠️ fid {task['fid']}: lease expired before completion, task was reassigned")
+
+                queue.heartbeat(worker_id)
+                time.sleep(0.3)
+    finally:
+        queue.leave(worker_id)
+        print(f"文 worker {worker_id} stopped")
+
+
+def run_local(workers, interval_seconds):
+    """Coordinator plus N local worker processes"""
+
+    import multiprocessing
+
+    procs = [
+        multiprocessing.Process(target=run_worker, daemon=True)
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    try:
+        run_coordinator(interval_seconds)
+    finally:
+        for p in procs:
+            p.terminate()
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "--help"
+    interval = 60
+
+    try:
+        if mode == "coordinator":
+            run_coordinator(interval)
+        elif mode == "worker":
+            run_worker(sys.argv[2] if len(sys.argv) > 2 else None)
+        elif mode == "local":
+            run_local(int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 2, interval)
+        else:
+            print("""
+文 sharded ingestion
+
+Usage:
+  python -m archiver.shard coordinator   # plan fetches and feed the queue
+  python -m archiver.shard worker [ID]   # run scrape+extract+save for owned partitions
+  python -m archiver.shard local [N]     # coordinator + N local workers (default: cores)
+
+Queue: SHARD_DB_FILE (SQLite WAL; every process must run on this host, not on a network filesystem)
+            """)
+    except KeyboardInterrupt:
+        print("\n✓ Stopped")
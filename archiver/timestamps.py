@@ -0,0 +1,39 @@
+"""
+timestamps.py
+One timestamp representation for the archive
+
+Hub messages carry seconds since the Farcaster epoch (2021-01-01 UTC).
+The scraper converts them once, to ISO 8601 UTC strings, which is what
+patterns.timestamp / entity_postings.timestamp (timestamptz) store and
+what every later stage reads.
+"""
+
+from datetime import datetime, timezone
+
+# Farcaster hub timestamps are seconds since 2021-01-01 UTC
+FARCASTER_EPOCH = 1609459200
+
+
+def from_hub(hub_seconds):
+    """ISO UTC string for a hub timestamp (None if missing)"""
+    if hub_seconds in (None, ""):
+        return None
+    return datetime.fromtimestamp(int(hub_seconds) + FARCASTER_EPOCH, timezone.utc).isoformat()
+
+
+def to_unix(value):
+    """
+    Unix seconds for an ISO string or number
+
+    Numbers below 1e9 are taken as legacy hub seconds (rows and state
+    written before the scraper converted them).
+    """
+
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        seconds = float(value)
+        return seconds + FARCASTER_EPOCH if seconds < 1e9 else seconds
+
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
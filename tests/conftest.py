@@ -0,0 +1,11 @@
+"""
+Unit tests for the archiver's pure logic (no network, no Supabase)
+
+Run from the repo root:
+  python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,113 @@
+import pytest
+
+from archiver import anomaly
+from archiver.config import ANOMALY_OPEN_HOURS, ANOMALY_WARMUP_HOURS
+
+START_HOUR = 480_000
+
+
+@pytest.fixture(autouse=True)
+def hashtag_metrics(monkeypatch):
+    """Metric keys without the entity index (volume + hashtags)"""
+    monkeypatch.setattr(anomaly, "metric_keys", lambda p: ["volume"] + [
+        f"hashtag:{t.lstrip('#')}" for t in (p.get("entities") or {}).get("hashtags", [])
+    ])
+
+
+def pattern(hour, n, tag=None, cluster_id=None):
+    return {
+        "cast_hash": f"0x{hour}-{n}",
+        "cluster_id": cluster_id or f"0x{hour}-{n}",
+        "timestamp": hour * 3600 + 60,
+        "entities": {"hashtags": [tag] if tag else []}
+    }
+
+
+def warmed_engine(tmp_path, hours=ANOMALY_WARMUP_HOURS + ANOMALY_OPEN_HOURS + 5):
+    engine = anomaly.AnomalyEngine(path=str(tmp_path / "anomaly.json"))
+    for hour in range(START_HOUR, START_HOUR + hours):
+        engine.observe([pattern(hour, n) for n in range(2)], now=hour * 3600 + 1800)
+    return engine, START_HOUR + hours
+
+
+def test_cold_engine_reports_no_spikes(tmp_path):
+    engine = anomaly.AnomalyEngine(path=str(tmp_path / "anomaly.json"))
+    engine.observe([pattern(START_HOUR, n, "#x") for n in range(50)], now=START_HOUR * 3600)
+    assert not engine.is_warm()
+    assert engine.spikes(now=START_HOUR * 3600) == []
+
+
+def test_burst_over_baseline_is_a_spike(tmp_path):
+    engine, hour = warmed_engine(tmp_path)
+    assert engine.is_warm()
+
+    now = hour * 3600 + 1800
+    engine.observe([pattern(hour, n, "#x") for n in range(30)], now=now)
+
+    metrics = {s["metric"] for s in engine.spikes(now=now)}
+    assert {"volume", "hashtag:x"} <= metrics
+
+
+def test_steady_volume_is_not_a_spike(tmp_path):
+    engine, hour = warmed_engine(tmp_path)
+    now = hour * 3600 + 1800
+    engine.observe([pattern(hour, n) for n in range(2)], now=now)
+    assert engine.spikes(now=now) == []
+
+
+def test_cluster_counts_once_per_hour(tmp_path):
+    engine, hour = warmed_engine(tmp_path)
+    now = hour * 3600 + 1800
+    engine.observe([pattern(hour, n, "#x", cluster_id="0xspam") for n in range(30)], now=now)
+
+    assert engine.spikes(now=now) == []
+    assert engine.channels["all"]["open"][hour]["hashtag:x"] == 1
+
+
+def test_window_summary_and_state_roundtrip(tmp_path):
+    engine, hour = warmed_engine(tmp_path)
+    now = hour * 3600 + 1800
+    engine.observe([pattern(hour, n, "#x", cluster_id="0xc") for n in range(3)], now=now)
+    engine.save()
+
+    summary = anomaly.AnomalyEngine(path=str(tmp_path / "anomaly.json")).window_summary(now=now)
+    assert summary["trending_hashtags"] == [("#x", 1)]
+    assert summary["total"] == 2 * (ANOMALY_OPEN_HOURS - 1) + 1
+    assert summary["timeframe_hours"] == ANOMALY_OPEN_HOURS
+
+
+def test_sync_reads_the_store_past_its_cursor(tmp_path, monkeypatch):
+    from archiver import db
+
+    hour = START_HOUR + 100
+    stored = [dict(pattern(hour, n, "#x"), id=i + 1) for i, n in enumerate(range(6))]
+    reads = []
+
+    def fake_pages(table, filters=None, select="*", page_size=1000, start_after=None):
+        reads.append((filters, start_after))
+        rows = [r for r in stored if start_after is None or r["id"] > start_after]
+        for i in range(0, len(rows), page_size):
+            yield rows[i:i + page_size]
+
+    monkeypatch.setattr(db, "iter_pages", fake_pages)
+
+    engine = anomaly.AnomalyEngine(path=str(tmp_path / "anomaly.json"))
+    now = hour * 3600 + 1800
+    assert engine.sync(now=now, page_size=4) == 6
+    assert engine.last_id == 6
+    assert engine.channels["all"]["open"][hour]["hashtag:x"] == 6
+
+    # Only the cold start is bounded by time; later syncs resume from the cursor
+    stored.append(dict(pattern(hour, 99, "#x"), id=7))
+    assert engine.sync(now=now) == 1
+    assert reads[0][0] and reads[0][1] is None
+    assert reads[-1] == ([], 6)
+    assert engine.channels["all"]["open"][hour]["hashtag:x"] == 7
+
+    engine.save()
+    assert anomaly.AnomalyEngine(path=str(tmp_path / "anomaly.json")).last_id == 7
+
+
+def test_state_file_is_keyed_by_worker():
+    assert anomaly._state_path(path="/tmp/anomaly_state.json") == "/tmp/anomaly_state.json"
+    assert anomaly._state_path("host:12", path="/tmp/anomaly_state.json") == "/tmp/anomaly_state.host_12.json"
@@ -0,0 +1,54 @@
+import time
+
+from archiver.bloom import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, fp_rate=0.01)
+    keys = [f"0x{i:040x}" for i in range(1000)]
+    bloom.add_many(keys)
+
+    assert all(k in bloom for k in keys)
+    # count skips keys whose bits were all set already (approximate by design)
+    assert 990 <= bloom.count <= 1000
+
+
+def test_false_positive_rate_near_target():
+    bloom = BloomFilter(capacity=2000, fp_rate=0.01)
+    bloom.add_many(f"in-{i}" for i in range(2000))
+
+    false_positives = sum(f"out-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.03
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "seen.bloom")
+    bloom = BloomFilter(capacity=100)
+    bloom.add_many(["a", "b", "c"])
+    bloom.save(path)
+
+    loaded = BloomFilter.load(path)
+    assert loaded is not None
+    assert "a" in loaded and "c" in loaded
+    assert (loaded.bits, loaded.hashes, loaded.capacity, loaded.count) == (bloom.bits, bloom.hashes, 100, 3)
+    assert list(tmp_path.iterdir()) == [tmp_path / "seen.bloom"]
+
+
+def test_load_rejects_missing_or_foreign_files(tmp_path):
+    assert BloomFilter.load(str(tmp_path / "missing.bloom")) is None
+
+    other = tmp_path / "other.bloom"
+    other.write_bytes(b"not a bloom filter")
+    assert BloomFilter.load(str(other)) is None
+
+
+def test_stale_when_over_capacity_or_old():
+    bloom = BloomFilter(capacity=10)
+    assert not bloom.is_stale()
+
+    bloom.add_many(str(i) for i in range(11))
+    assert bloom.is_stale()
+
+    fresh = BloomFilter(capacity=10)
+    fresh.built_at = time.time() - 10 * 24 * 3600
+    assert fresh.is_stale()
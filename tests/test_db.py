@@ -0,0 +1,30 @@
+import json
+
+from archiver.db import chunk_patterns
+
+
+def pattern(i, text="gm"):
+    return {"cast_hash": f"0x{i}", "content": text, "entities": {"hashtags": []}}
+
+
+def test_chunks_respect_row_limit():
+    chunks = list(chunk_patterns([pattern(i) for i in range(25)], max_rows=10, max_bytes=10**6))
+    assert [len(c) for c in chunks] == [10, 10, 5]
+
+
+def test_chunks_respect_payload_size():
+    patterns = [pattern(i, "x" * 400) for i in range(10)]
+    chunks = list(chunk_patterns(patterns, max_rows=100, max_bytes=1500))
+
+    assert sum(len(c) for c in chunks) == 10
+    assert all(len(json.dumps(c).encode("utf-8")) <= 1500 for c in chunks)
+
+
+def test_oversized_row_gets_its_own_chunk():
+    patterns = [pattern(0), pattern(1, "x" * 5000), pattern(2)]
+    chunks = list(chunk_patterns(patterns, max_rows=100, max_bytes=1000))
+    assert [[p["cast_hash"] for p in c] for c in chunks] == [["0x0"], ["0x1"], ["0x2"]]
+
+
+def test_no_patterns_no_chunks():
+    assert list(chunk_patterns([])) == []
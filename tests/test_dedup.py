@@ -0,0 +1,47 @@
+from archiver.dedup import NearDupDetector, normalize_text
+
+
+def test_normalize_drops_urls_and_punctuation():
+    assert normalize_text("GM, everyone!! https://a.com/x?y=1 @Alice #Base") == "gm everyone @alice #base"
+
+
+def test_near_duplicates_share_a_cluster():
+    detector = NearDupDetector()
+    first, new = detector.assign("0xa", "huge airdrop for early base users claim it now before it ends")
+    second, new2 = detector.assign("0xb", "HUGE airdrop for early base users, claim it now before it ends!")
+
+    assert new and not new2
+    assert first == second == "0xa"
+
+
+def test_url_only_differences_cluster_together():
+    detector = NearDupDetector()
+    first, _ = detector.assign("0xa", "gm everyone check this out https://a.com")
+    second, _ = detector.assign("0xb", "gm everyone check this out https://b.com")
+    assert first == second
+
+
+def test_different_casts_get_their_own_clusters():
+    detector = NearDupDetector()
+    first, _ = detector.assign("0xa", "shipping a new onchain game tonight with friends")
+    second, new = detector.assign("0xb", "the weather in lisbon is great for a long walk")
+    assert new and first != second
+
+
+def test_short_casts_only_cluster_on_exact_text():
+    detector = NearDupDetector()
+    gm, _ = detector.assign("0xa", "gm")
+    assert detector.assign("0xb", "GM!")[0] == gm
+    assert detector.assign("0xc", "gn")[0] == "0xc"
+
+
+def test_window_evicts_oldest_clusters():
+    detector = NearDupDetector(window=2)
+    detector.assign("0xa", "first cast about something quite specific")
+    detector.assign("0xb", "second cast on another topic entirely here")
+    detector.entities[normalize_text("first cast about something quite specific")] = {"hashtags": []}
+    detector.assign("0xc", "third cast talking about yet another thing")
+
+    assert "0xa" not in detector.fingerprints
+    assert not detector.entities
+    assert detector.assign("0xd", "first cast about something quite specific")[0] == "0xd"
@@ -0,0 +1,34 @@
+import pytest
+
+from archiver.digest import merkle_root, merkle_proof, verify_proof
+
+HASHES = [f"0x{i:040x}" for i in range(7)]
+
+
+def test_root_ignores_order_and_repeats():
+    assert merkle_root(HASHES) == merkle_root(list(reversed(HASHES)) + HASHES[:2])
+    assert merkle_root(HASHES).startswith("0x") and len(merkle_root(HASHES)) == 66
+
+
+def test_empty_and_single_leaf():
+    assert merkle_root([]) is None
+    root = merkle_root(["0xabc"])
+    assert merkle_proof(["0xabc"], "0xabc") == []
+    assert verify_proof("0xabc", [], root)
+
+
+@pytest.mark.parametrize("count", [2, 3, 4, 5, 7, 8])
+def test_every_member_proves_against_the_root(count):
+    hashes = HASHES[:count] if count <= len(HASHES) else HASHES + [f"0xf{i}" for i in range(count - len(HASHES))]
+    root = merkle_root(hashes)
+    for cast_hash in hashes:
+        assert verify_proof(cast_hash, merkle_proof(hashes, cast_hash), root)
+
+
+def test_non_member_and_tampering_fail():
+    root = merkle_root(HASHES)
+    assert merkle_proof(HASHES, "0xnot-in-batch") is None
+
+    proof = merkle_proof(HASHES, HASHES[0])
+    assert not verify_proof(HASHES[1], proof, root)
+    assert not verify_proof(HASHES[0], proof, merkle_root(HASHES[:-1]))
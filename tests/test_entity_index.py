@@ -0,0 +1,45 @@
+import pytest
+
+from archiver.entity_index import normalize, parse_term, postings_for
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("#Base", ("hashtag", "base")),
+    ("@Dan", ("mention", "dan")),
+    ("domain:Mirror.xyz", ("domain", "mirror.xyz")),
+    ("zora.co", ("domain", "zora.co")),
+    ("gm", ("hashtag", "gm")),
+])
+def test_parse_term(term, expected):
+    assert parse_term(term) == expected
+
+
+def test_normalize_strips_sigils_and_case():
+    assert normalize("hashtag", " #BASE ") == "base"
+    assert normalize("mention", "@Dan") == "dan"
+    assert normalize("domain", None) == ""
+
+
+def test_postings_for_dedupes_and_sorts_entities():
+    pattern = {
+        "cast_hash": "0x1",
+        "timestamp": "2026-01-01T00:00:00+00:00",
+        "channel": "/base",
+        "entities": {
+            "hashtags": ["#Base", "#base"],
+            "mentions": ["@Dan"],
+            "urls": ["https://www.mirror.xyz/post", ""]
+        }
+    }
+
+    postings = postings_for(pattern)
+    assert [(p["kind"], p["entity"]) for p in postings] == [
+        ("domain", "mirror.xyz"),
+        ("hashtag", "base"),
+        ("mention", "dan")
+    ]
+    assert all(p["cast_hash"] == "0x1" and p["channel"] == "/base" for p in postings)
+
+
+def test_postings_for_pattern_without_entities():
+    assert postings_for({"cast_hash": "0x1"}) == []
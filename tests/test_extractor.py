@@ -0,0 +1,49 @@
+import pytest
+
+from archiver import extractor
+from archiver.config import EXTRACTOR_VERSION
+from archiver.dedup import NearDupDetector
+from archiver.extractor import LOCAL_EXTRACTOR_VERSION, process_casts
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    """Fresh clusters, no profile lookups, a fake LLM that reads hashtags"""
+    calls = []
+
+    def fake_extract(text):
+        calls.append(text)
+        return extractor.local_extract(text), True
+
+    monkeypatch.setattr(extractor, "detector", NearDupDetector())
+    monkeypatch.setattr(extractor, "resolve_authors", lambda casts: casts)
+    monkeypatch.setattr(extractor, "_cached_extract", fake_extract)
+    return calls
+
+
+def cast(i, text):
+    return {"hash": f"0x{i}", "text": text, "timestamp": "2026-01-01T00:00:00+00:00", "author": {"fid": i}}
+
+
+def test_near_duplicates_keep_their_own_hashtags(offline):
+    patterns = process_casts([
+        cast(1, "gm everyone hope you all have a great day today #base"),
+        cast(2, "gm everyone hope you all have a great day today #zora")
+    ])
+
+    assert patterns[0]["cluster_id"] == patterns[1]["cluster_id"] == "0x1"
+    assert patterns[1]["entities"]["hashtags"] == ["#zora"]
+    assert patterns[1]["extractor_version"] == LOCAL_EXTRACTOR_VERSION
+    assert len(offline) == 1
+
+
+def test_same_text_shares_entities_but_not_links(offline):
+    patterns = process_casts([
+        cast(1, "gm everyone check this out #base https://a.com"),
+        cast(2, "GM everyone, check this out! #base https://b.com")
+    ])
+
+    assert patterns[1]["entities"]["hashtags"] == ["#base"]
+    assert patterns[1]["entities"]["urls"] == ["https://b.com"]
+    assert patterns[1]["extractor_version"] == EXTRACTOR_VERSION
+    assert len(offline) == 1
@@ -0,0 +1,69 @@
+from archiver.config import MIN_FETCH_DEPTH, MAX_FETCH_DEPTH
+from archiver.frontier import FidFrontier
+from archiver.timestamps import from_hub, to_unix
+
+NOW = 1_760_000_000
+
+
+def casts_at(*unix_seconds):
+    return [{"timestamp": from_hub(ts - 1609459200)} for ts in unix_seconds]
+
+
+def test_record_counts_only_casts_newer_than_seen(tmp_path):
+    frontier = FidFrontier(path=str(tmp_path / "frontier.json"))
+
+    assert frontier.record(1, casts_at(NOW - 300, NOW - 200), now=NOW) == 2
+    assert frontier.stats[1]["last_ts"] == NOW - 200
+
+    assert frontier.record(1, casts_at(NOW - 200, NOW + 100), now=NOW + 3600) == 1
+    assert frontier.stats[1]["last_ts"] == NOW + 100
+
+
+def test_plan_respects_budget_and_depth_bounds(tmp_path):
+    frontier = FidFrontier(path=str(tmp_path / "frontier.json"))
+    frontier.add(range(1, 11))
+
+    plan = frontier.plan(limit=50, budget=4, now=NOW)
+    assert len(plan) == 4
+    assert all(MIN_FETCH_DEPTH <= depth <= MAX_FETCH_DEPTH for _, depth in plan)
+
+
+def test_unfetched_fids_are_explored_first(tmp_path):
+    frontier = FidFrontier(path=str(tmp_path / "frontier.json"))
+    frontier.record(1, casts_at(NOW - 100), now=NOW)
+    frontier.add([2])
+
+    assert frontier.plan(limit=10, budget=1, now=NOW + 60)[0][0] == 2
+
+
+def test_state_roundtrip_converts_legacy_hub_seconds(tmp_path):
+    path = str(tmp_path / "frontier.json")
+    frontier = FidFrontier(path=path)
+    frontier.record(7, casts_at(NOW), now=NOW)
+    frontier.stats[8] = {**frontier.stats[7], "last_ts": NOW - 1609459200}
+    frontier.save()
+
+    loaded = FidFrontier(path=path)
+    assert loaded.stats[7]["last_ts"] == NOW
+    assert loaded.stats[8]["last_ts"] == to_unix(NOW - 1609459200) == NOW
+
+
+def test_full_pages_of_new_casts_raise_the_rate(tmp_path):
+    frontier = FidFrontier(path=str(tmp_path / "frontier.json"))
+    posted = 0
+
+    # Posts 10/h, polled every 6h at depth 25: every page is full and new
+    for poll in range(15):
+        now = NOW + poll * 6 * 3600
+        page = casts_at(*(now - i * 360 for i in range(25)))
+        posted = frontier.record(1, page, now=now, depth=25)
+
+    assert posted == 25
+    assert frontier.stats[1]["rate"] > 10
+
+    # A page with room to spare brings the estimate back to what was seen
+    now += 3600
+    for _ in range(20):
+        frontier.record(1, casts_at(now - 60), now=now, depth=25)
+        now += 3600
+    assert frontier.stats[1]["rate"] < 2
@@ -0,0 +1,71 @@
+import time
+
+from archiver.governor import Governor
+from archiver.config import GOVERNOR_TIERS
+
+
+def governor(**budgets):
+    g = Governor(log_file=None)
+    g.start_cycle(label="test", **{"hub": 100, "tokens": 1000, "db": 100, "seconds": 0, **budgets})
+    return g
+
+
+def test_idle_governor_is_unlimited():
+    g = Governor(log_file=None)
+    g.charge("hub", 10_000)
+    assert g.allow("hub")
+    assert g.remaining("hub") is None
+    assert not g.use_local_extraction()
+    assert not g.defer_analysis()
+
+
+def test_tiers_escalate_with_pressure():
+    g = governor()
+
+    g.charge("hub", round(GOVERNOR_TIERS[0] * 100))
+    assert g.scrape_depth(1, 20, low_yield=True, min_depth=5) == 5
+    assert g.scrape_depth(2, 20, low_yield=False, min_depth=5) == 20
+    assert not g.use_local_extraction()
+
+    g.charge("hub", round((GOVERNOR_TIERS[1] - GOVERNOR_TIERS[0]) * 100))
+    assert g.use_local_extraction()
+    assert not g.defer_analysis()
+
+    g.charge("hub", round((GOVERNOR_TIERS[2] - GOVERNOR_TIERS[1]) * 100))
+    assert g.tier == 3
+    assert g.defer_analysis()
+
+
+def test_tier_never_steps_down():
+    g = governor(tokens=0)
+    g.charge("hub", 90)
+    tier = g.tier
+    g.budgets["hub"] = 10_000
+    g.charge("hub", 0)
+    assert g.tier == tier
+
+
+def test_exhausted_budgets_stop_their_work():
+    g = governor(db=10)
+    g.charge("db", 10)
+    assert g.allow("hub")
+    assert not g.allow("db")
+    assert g.defer_analysis("rollups")
+
+    g = governor(tokens=100)
+    g.charge("tokens", 100)
+    assert g.use_local_extraction()
+
+    g = governor(hub=3)
+    g.charge("hub", 3)
+    assert not g.allow("hub")
+    assert g.remaining("hub") == 0
+
+
+def test_out_of_time_stops_everything():
+    g = governor(seconds=60)
+    g.started = time.time() - 61
+    assert not g.allow("hub")
+    assert g.use_local_extraction()
+    assert g.defer_analysis()
+    assert [d["resource"] for d in g.decisions if d["action"] == "budget exhausted"] == ["time"]
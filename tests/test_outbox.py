@@ -0,0 +1,57 @@
+import pytest
+
+from archiver import outbox
+from archiver.config import OUTBOX_MAX_ATTEMPTS
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Capture outbox row updates instead of writing them"""
+    updates = []
+    monkeypatch.setattr(outbox, "_update", lambda batch_id, fields: updates.append((batch_id, fields)))
+    return updates
+
+
+def notice(**fields):
+    return {"batch_id": 7, "text": "文 · batch 7", "attempts": 0, "cast_hash": None, **fields}
+
+
+def test_posted_and_attached_is_sent(monkeypatch, recorded):
+    sent = []
+    monkeypatch.setattr(outbox, "send_cast", lambda text, idem: (sent.append(idem), ("0xcast", None))[1])
+    monkeypatch.setattr(outbox, "attach_cast_hash", lambda batch_id, cast_hash: True)
+
+    assert outbox._deliver(notice())
+    assert sent == ["wen-batch-7"]
+    assert recorded == [(7, {"status": "sent", "cast_hash": "0xcast", "last_error": None})]
+
+
+def test_send_failure_backs_off(monkeypatch, recorded):
+    monkeypatch.setattr(outbox, "send_cast", lambda text, idem: (None, "timeout"))
+
+    assert not outbox._deliver(notice(attempts=2))
+    fields = recorded[0][1]
+    assert fields["status"] == "pending"
+    assert fields["attempts"] == 3
+    assert fields["last_error"] == "timeout"
+    assert "next_attempt_at" in fields
+
+
+def test_posted_but_unattached_keeps_cast_hash_and_never_reposts(monkeypatch, recorded):
+    monkeypatch.setattr(outbox, "send_cast", lambda text, idem: ("0xcast", None))
+    monkeypatch.setattr(outbox, "attach_cast_hash", lambda batch_id, cast_hash: False)
+
+    assert not outbox._deliver(notice())
+    assert recorded[0][1]["cast_hash"] == "0xcast"
+
+    # The retry only attaches
+    monkeypatch.setattr(outbox, "send_cast", lambda text, idem: pytest.fail("reposted"))
+    monkeypatch.setattr(outbox, "attach_cast_hash", lambda batch_id, cast_hash: True)
+    assert outbox._deliver(notice(attempts=1, cast_hash="0xcast"))
+
+
+def test_gives_up_after_max_attempts(monkeypatch, recorded):
+    monkeypatch.setattr(outbox, "send_cast", lambda text, idem: (None, "status 500"))
+
+    assert not outbox._deliver(notice(attempts=OUTBOX_MAX_ATTEMPTS - 1))
+    assert recorded[0][1]["status"] == "failed"
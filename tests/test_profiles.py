@@ -0,0 +1,40 @@
+from collections import Counter
+
+from archiver.profiles import FairScheduler
+
+
+def profiles(*weights):
+    return [{"name": f"p{i}", "weight": w} for i, w in enumerate(weights)]
+
+
+def test_cycle_never_exceeds_budget():
+    scheduler = FairScheduler(profiles(*([1] * 60)), budget=40)
+    for _ in range(10):
+        plan = scheduler.allocate()
+        assert sum(n for _, n in plan) == 40
+        assert all(n >= 1 for _, n in plan)
+
+
+def test_small_profiles_get_their_share_over_time():
+    scheduler = FairScheduler(profiles(*([1] * 60)), budget=40)
+    granted = Counter()
+    for _ in range(30):
+        for profile, n in scheduler.allocate():
+            granted[profile["name"]] += n
+
+    assert len(granted) == 60
+    assert max(granted.values()) - min(granted.values()) <= 1
+
+
+def test_grants_follow_weights():
+    scheduler = FairScheduler(profiles(3, 1), budget=40)
+    granted = Counter()
+    for _ in range(10):
+        for profile, n in scheduler.allocate():
+            granted[profile["name"]] += n
+
+    assert granted == {"p0": 300, "p1": 100}
+
+
+def test_no_profiles_no_plan():
+    assert FairScheduler([], budget=40).allocate() == []
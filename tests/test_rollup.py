@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from archiver import rollup
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Record rollup_hours calls; the last compacted bucket is 2024-05-01 12:00"""
+    made = []
+    monkeypatch.setattr(rollup, "_edge", lambda *a, **k: datetime(2024, 5, 1, 12, tzinfo=timezone.utc))
+    monkeypatch.setattr(rollup, "_rpc", lambda name, params, **k: (made.append((name, params["p_from"], params["p_to"])), 1)[1])
+    return made
+
+
+def test_touched_hours_are_recomputed_in_runs(calls):
+    written = rollup.recompute_hours([
+        "2024-04-01T03:15:00+00:00",
+        "2024-04-01T04:59:00+00:00",
+        "2024-04-01T03:40:00Z",
+        "2024-04-20T10:00:00",
+        None
+    ])
+
+    assert written == 2
+    assert calls == [
+        ("rollup_hours", "2024-04-01T03:00:00+00:00", "2024-04-01T05:00:00+00:00"),
+        ("rollup_hours", "2024-04-20T10:00:00+00:00", "2024-04-20T11:00:00+00:00")
+    ]
+
+
+def test_hours_not_yet_compacted_are_left_to_compact(calls):
+    assert rollup.recompute_hours(["2024-05-01T12:30:00+00:00", "2024-05-01T13:10:00+00:00"]) == 1
+    assert calls == [("rollup_hours", "2024-05-01T12:00:00+00:00", "2024-05-01T13:00:00+00:00")]
@@ -0,0 +1,106 @@
+import pytest
+
+from archiver import shard
+from archiver.shard import HashRing, WorkQueue, partition_of
+
+
+def test_ring_owner_is_stable_and_total():
+    ring = HashRing(["w1", "w2", "w3"])
+    owners = [ring.owner(p) for p in range(64)]
+
+    assert owners == [HashRing(["w3", "w1", "w2"]).owner(p) for p in range(64)]
+    assert set(owners) == {"w1", "w2", "w3"}
+    assert HashRing([]).owner(1) is None
+
+
+def test_removing_a_node_only_moves_its_keys():
+    before = HashRing(["w1", "w2", "w3"])
+    after = HashRing(["w1", "w2"])
+
+    for key in range(500):
+        if before.owner(key) != "w3":
+            assert after.owner(key) == before.owner(key)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return WorkQueue(path=str(tmp_path / "queue.db"))
+
+
+def test_claim_one_task_at_a_time_and_complete(queue):
+    queue.heartbeat("w1")
+    assert queue.enqueue(1, 5)
+    assert queue.enqueue(2, 5)
+    assert not queue.enqueue(1, 5)
+
+    task = queue.claim("w1")
+    assert len(task) == 1 and task[0]["fid"] == 1
+
+    assert queue.complete(task[0]["id"], "w1", {"timestamps": []})
+    assert queue.collect() == [(1, None, {"timestamps": []})]
+    assert queue.pending_count() == 1
+
+
+def test_expired_task_moves_to_a_live_worker(queue):
+    queue.heartbeat("w1")
+    queue.enqueue(1, 5)
+    task = queue.claim("w1")[0]
+
+    # w1's leases lapse (no heartbeat), w2 takes over the ring and the task
+    queue.conn.execute("UPDATE workers SET lease_until = 0 WHERE worker_id = 'w1'")
+    queue.conn.execute("UPDATE tasks SET lease_until = 0")
+    queue.heartbeat("w2")
+
+    assert [t["id"] for t in queue.claim("w2")] == [task["id"]]
+    assert not queue.complete(task["id"], "w1", {})
+    assert queue.complete(task["id"], "w2", {})
+
+
+def test_heartbeat_renews_claimed_task_leases(queue):
+    queue.heartbeat("w1")
+    queue.enqueue(1, 5)
+    task = queue.claim("w1")[0]
+
+    queue.conn.execute("UPDATE tasks SET lease_until = 0")
+    queue.heartbeat("w1")
+    queue.heartbeat("w2")
+
+    # Renewed, so neither worker can reclaim it
+    assert queue.claim("w1") == [] and queue.claim("w2") == []
+    assert queue.complete(task["id"], "w1", {})
+
+
+def test_partition_is_deterministic():
+    assert partition_of(12345) == partition_of("12345")
+    assert 0 <= partition_of(12345) < shard.SHARD_PARTITIONS
+
+
+def test_failed_task_is_released_with_backoff(queue):
+    queue.heartbeat("w1")
+    queue.enqueue(1, 5)
+    task = queue.claim("w1")[0]
+
+    assert queue.release(task["id"], "w1")
+    queue.heartbeat("w1")
+
+    # Backing off: not claimable yet, and no duplicate task for the FID
+    assert queue.claim("w1") == []
+    assert not queue.enqueue(1, 5)
+
+    queue.conn.execute("UPDATE tasks SET not_before = 0")
+    retried = queue.claim("w1")
+    assert [t["id"] for t in retried] == [task["id"]]
+    assert queue.conn.execute("SELECT attempts FROM tasks").fetchone()[0] == 1
+
+
+def test_task_is_dropped_after_max_attempts(queue):
+    queue.heartbeat("w1")
+    queue.enqueue(1, 5)
+
+    for _ in range(shard.SHARD_MAX_ATTEMPTS):
+        queue.conn.execute("UPDATE tasks SET not_before = 0")
+        task = queue.claim("w1")[0]
+        assert queue.release(task["id"], "w1")
+
+    assert queue.pending_count() == 0
+    assert queue.enqueue(1, 5)